@@ -1,28 +1,101 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
 
-def load_and_analyze_data():
+# The load, validation and funnel helpers are shared with the dashboard in streamlit-package/
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit-package')
+if PACKAGE_DIR not in sys.path:
+    sys.path.insert(0, PACKAGE_DIR)
+
+from delivery_pipeline import (
+    COUNT_COLUMNS,
+    FUNNEL_STAGES,
+    LOW_MEMORY_DROP_COLUMNS,
+    SUMMARY_GROUPING_SETS,
+    coerce_and_validate_counts,
+    compact_rows,
+    compute_funnel,
+    estimate_load_memory_mb,
+    file_version,
+    parse_as_of_dates,
+    profile_stage,
+    read_rss_mb,
+    record_memory_footprint,
+    reduce_counts
+)
+
+MATERIALIZED_MEASURES = ['requestedcount', 'submittedcount', 'sentcount', 'deliveredcount',
+                         'readcount', 'failedcount', 'pendingcount', 'notsentcount']
+
+ACCOUNT_REPORT_FORMATS = ['csv', 'json', 'md']
+
+def print_memory_report(trace, footprints):
+    """Print per-stage RSS and per-object footprints"""
+    print(f"\n{'='*60}")
+    print("🧠 MEMORY REPORT")
+    print(f"{'='*60}")
+    stages = pd.DataFrame(trace)
+    print("Per-stage RSS (MB):")
+    print(stages[['stage', 'rss_mb', 'rss_delta_mb', 'peak_rss_mb']].to_string(index=False, float_format='%.1f'))
+    if footprints:
+        print(f"\n📦 Frame and buffer footprints (MB):")
+        print(pd.DataFrame(footprints).to_string(index=False, float_format='%.3f'))
+
+def print_quality_report(quality_report):
+    """Print the data-quality rules that flagged rows, with sample row indexes"""
+    print(f"\n{'='*60}")
+    print("🧪 DATA QUALITY")
+    print(f"{'='*60}")
+    failing = [rule for rule in quality_report if rule['violations']]
+    if not failing:
+        print(f"✅ All {len(quality_report)} type and funnel checks passed")
+    for rule in failing:
+        print(f"  ⚠️ {rule['rule']}: {rule['violations']:,} rows (e.g. rows {', '.join(map(str, rule['sample_rows']))})")
+
+def write_profile_trace(trace, trace_path, file_path, footprints=None):
+    """Write the per-stage timings and memory as a JSON trace"""
+    profile = {
+        'file': file_path,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'total_wall_seconds': sum(stage['wall_seconds'] for stage in trace),
+        'total_cpu_seconds': sum(stage['cpu_seconds'] for stage in trace),
+        'stages': trace,
+        'footprints': footprints or []
+    }
+    with open(trace_path, 'w') as f:
+        json.dump(profile, f, indent=2, default=float)
+    print(f"⏱️ Profile trace written to '{trace_path}' ({profile['total_wall_seconds']:.3f}s across {len(trace)} stages)")
+
+def load_and_analyze_data(file_path='test 27th.csv', trace=None, low_memory=False, footprints=None, quality_report=None,
+                          compact=False):
     """Load and analyze the test 27th.csv file"""
     
     # Load the data
-    print("📊 Loading data from 'test 27th.csv'...")
-    df = pd.read_csv('test 27th.csv')
+    print(f"📊 Loading data from '{file_path}'{' in low-memory mode' if low_memory else ''}...")
+    with profile_stage(trace, 'read_csv'):
+        if low_memory:
+            df = pd.read_csv(file_path, usecols=lambda col: col not in LOW_MEMORY_DROP_COLUMNS)
+        else:
+            df = pd.read_csv(file_path)
+    record_memory_footprint(footprints, 'raw', df)
     
     # Convert numeric columns to proper types
-    numeric_columns = ['requestedcount', 'submittedcount', 'sentcount', 'deliveredcount', 
-                      'readcount', 'failedcount', 'notsentcount']
-    
-    for col in numeric_columns:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    with profile_stage(trace, 'numeric_coercion'):
+        coerce_and_validate_counts(df, COUNT_COLUMNS, low_memory, quality_report)
+    record_memory_footprint(footprints, 'coerced', df)
     
     print(f"✅ Data loaded successfully!")
     print(f"📈 Total records: {len(df):,}")
     print(f"📋 Total columns: {len(df.columns)}")
-    print(f"📅 Date range: {df['as_of_date'].min()} to {df['as_of_date'].max()}")
+    dates = pd.Series(parse_as_of_dates(df['as_of_date']))
+    print(f"📅 Date range: {dates.min():%B %d, %Y} to {dates.max():%B %d, %Y}")
     
     # Display column names
     print(f"\n📝 Available columns:")
@@ -32,6 +105,15 @@ def load_and_analyze_data():
     # Basic data info
     print(f"\n🔍 Data Overview:")
     print(df.info())
+
+    if compact:
+        with profile_stage(trace, 'compact_rows'):
+            compacted = compact_rows(df, COUNT_COLUMNS)
+        record_memory_footprint(footprints, 'compacted', compacted)
+        dropped = [col for col in df.columns if col not in compacted.columns]
+        print(f"\n🗜️ Compacted {len(df):,} rows into {len(compacted):,} "
+              f"({len(df) / max(len(compacted), 1):,.1f}× smaller); dropped {', '.join(dropped) or 'no columns'}")
+        df = compacted
     
     return df
 
@@ -41,10 +123,16 @@ def analyze_origin_type_filter(df):
     print("1. 🔍 ORIGIN TYPE ANALYSIS")
     print(f"{'='*60}")
     
-    origin_counts = df['origintype'].value_counts()
+    if 'record_count' in df.columns:
+        # Compacted rows each stand for record_count raw records
+        origin_counts = df.groupby('origintype', sort=False)['record_count'].sum().sort_values(ascending=False, kind='stable')
+        total_records = df['record_count'].sum()
+    else:
+        origin_counts = df['origintype'].value_counts()
+        total_records = len(df)
     print(f"Origin Types found:")
     for origin, count in origin_counts.items():
-        print(f"  • {origin}: {count:,} records ({count/len(df)*100:.1f}%)")
+        print(f"  • {origin}: {count:,} records ({count/total_records*100:.1f}%)")
     
     return origin_counts
 
@@ -194,6 +282,123 @@ def analyze_pricing_delivery_table(df):
     
     return pricing_delivery
 
+def score_failure_anomalies(df, key_columns, window=14, min_history=3, threshold=3.0, min_std=1.0,
+                            min_requested=100):
+    """Score every series-day failure rate against the series' trailing baseline in one vectorized pass
+
+    The baseline is the window's pooled rate (total failed / total requested), so low-volume days
+    weigh little. A day's expected spread combines the binomial error of its own volume,
+    sqrt(p(1-p)/n), with the day-to-day spread of the window's rates. Days requesting fewer than
+    min_requested messages are scored but never flagged.
+    """
+    dates = pd.Series(parse_as_of_dates(df['as_of_date']), index=df.index, name='date')
+    daily = df.groupby(key_columns + [dates])[['failedcount', 'requestedcount']].sum().reset_index()
+    if daily.empty:
+        return daily
+
+    failed = daily['failedcount'].to_numpy(dtype=float)
+    requested = daily['requestedcount'].to_numpy(dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(requested > 0, failed / requested * 100, np.nan)
+
+    # Rows are sorted by key then date, so each series is a contiguous run
+    n = len(daily)
+    boundary = np.zeros(n, dtype=bool)
+    boundary[0] = True
+    for col in key_columns:
+        values = daily[col].to_numpy()
+        boundary[1:] |= values[1:] != values[:-1]
+    series_start = np.flatnonzero(boundary)[np.cumsum(boundary) - 1]
+
+    # Prefix sums turn every trailing-window total/mean/std into two lookups per row
+    valid = ~np.isnan(rate)
+    observed = np.where(valid, rate, 0.0)
+    prefix_failed = np.concatenate(([0.0], np.cumsum(np.where(valid, failed, 0.0))))
+    prefix_requested = np.concatenate(([0.0], np.cumsum(np.where(valid, requested, 0.0))))
+    prefix_sum = np.concatenate(([0.0], np.cumsum(observed)))
+    prefix_sq = np.concatenate(([0.0], np.cumsum(observed * observed)))
+    prefix_n = np.concatenate(([0], np.cumsum(valid)))
+
+    position = np.arange(n)
+    lo = np.maximum(position - window, series_start)
+    history = prefix_n[position] - prefix_n[lo]
+    history_requested = prefix_requested[position] - prefix_requested[lo]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pooled = (prefix_failed[position] - prefix_failed[lo]) / history_requested
+        mean_rate = (prefix_sum[position] - prefix_sum[lo]) / history
+        variance = (prefix_sq[position] - prefix_sq[lo]) / history - mean_rate ** 2
+        proportion = np.clip(pooled, 0, 1)
+        binomial_std = np.sqrt(proportion * (1 - proportion) / requested) * 100
+    baseline_std = np.sqrt(np.clip(variance, 0, None))
+    expected_std = np.maximum(np.sqrt(binomial_std ** 2 + baseline_std ** 2), min_std)
+
+    daily['failure_rate'] = rate
+    daily['history_days'] = history
+    daily['baseline_rate'] = pooled * 100
+    daily['baseline_std'] = baseline_std
+    daily['expected_std'] = expected_std
+    daily['z_score'] = (rate - pooled * 100) / expected_std
+    daily['is_spike'] = ((history >= min_history) & (requested >= min_requested)
+                         & (daily['z_score'].to_numpy() >= threshold))
+
+    return daily
+
+def analyze_funnel_conversion(df, dimensions=('pricingmodel', 'country', 'accountid'), top_n=10):
+    """10. Stage-to-stage funnel conversion overall and per dimension"""
+    print(f"\n{'='*60}")
+    print("10. 🔻 FUNNEL CONVERSION")
+    print(f"{'='*60}")
+
+    overall = compute_funnel(df)
+    stages = [col for col in FUNNEL_STAGES if col in overall.columns]
+    print("Overall Funnel:")
+    print(f"  • {stages[0].replace('count', '').title()}: {overall[stages[0]].iloc[0]:,}")
+    for stage in stages[1:]:
+        name = stage.replace('count', '')
+        print(f"  • {name.title()}: {overall[stage].iloc[0]:,} "
+              f"({overall[f'{name}_conversion'].iloc[0]:.2f}% of previous stage, "
+              f"{overall[f'{name}_percentage'].iloc[0]:.2f}% of requested)")
+
+    funnels = {}
+    for dimension in dimensions:
+        if dimension not in df.columns:
+            continue
+        funnels[dimension] = compute_funnel(df, [dimension])
+        conversion_columns = [f"{stage.replace('count', '')}_conversion" for stage in stages[1:]]
+        top = funnels[dimension].nlargest(top_n, 'requestedcount')
+        print(f"\nStage Conversion by {dimension} (top {min(top_n, len(top))} by requests, % of previous stage):")
+        print(top[[dimension, stages[0]] + conversion_columns].to_string(index=False, float_format='%.2f'))
+
+    return overall, funnels
+
+def analyze_failure_anomalies(df, window=14, min_history=3, threshold=3.0, min_requested=100):
+    """9. Failure spike detection per account-day and template-day"""
+    print(f"\n{'='*60}")
+    print("9. 🚨 FAILURE SPIKE DETECTION")
+    print(f"{'='*60}")
+
+    account_scores = score_failure_anomalies(df, ['accountid'], window, min_history, threshold,
+                                             min_requested=min_requested)
+    template_scores = score_failure_anomalies(df, ['tmplid', 'accountid'], window, min_history, threshold,
+                                              min_requested=min_requested)
+
+    if account_scores.empty or account_scores['date'].nunique() <= min_history:
+        print(f"ℹ️ Baselines need more than {min_history} days of as_of_date history; "
+              f"found {account_scores['date'].nunique() if not account_scores.empty else 0}.")
+
+    for label, key_columns, scores in [("Account", ['accountid'], account_scores),
+                                       ("Template", ['tmplid', 'accountid'], template_scores)]:
+        if scores.empty:
+            continue
+        spikes = scores[scores['is_spike']].sort_values('z_score', ascending=False)
+        print(f"\n📊 {label}-days scored: {len(scores):,} "
+              f"({scores.groupby(key_columns).ngroups:,} series), spikes flagged: {len(spikes):,}")
+        if not spikes.empty:
+            print(f"Top 10 {label} Failure Spikes:")
+            print(spikes.head(10).to_string(index=False, float_format='%.2f'))
+
+    return account_scores, template_scores
+
 def generate_summary_report(df):
     """Generate a comprehensive summary report"""
     print(f"\n{'='*60}")
@@ -201,28 +406,29 @@ def generate_summary_report(df):
     print(f"{'='*60}")
     
     # Overall metrics
-    total_requested = df['requestedcount'].sum()
-    total_submitted = df['submittedcount'].sum()
-    total_sent = df['sentcount'].sum()
-    total_delivered = df['deliveredcount'].sum()
-    total_failed = df['failedcount'].sum()
-    total_pending = df['pendingcount'].sum()
-    total_not_sent = df['notsentcount'].sum()
+    summary_columns = ['requestedcount', 'submittedcount', 'sentcount', 'deliveredcount',
+                       'failedcount', 'pendingcount', 'notsentcount']
+    totals = reduce_counts(df, summary_columns)
+    (total_requested, total_submitted, total_sent, total_delivered,
+     total_failed, total_pending, total_not_sent) = (totals[col].iloc[0] for col in summary_columns)
+    # Every share of requestedcount in one vectorized division
+    (_, submitted_pct, sent_pct, delivered_pct,
+     failed_pct, pending_pct, not_sent_pct) = totals.to_numpy(dtype=np.float64)[0] / total_requested * 100
     
     print(f"📈 OVERALL PERFORMANCE METRICS:")
     print(f"  • Total Requested: {total_requested:,}")
-    print(f"  • Total Submitted: {total_submitted:,} ({total_submitted/total_requested*100:.2f}%)")
-    print(f"  • Total Sent: {total_sent:,} ({total_sent/total_requested*100:.2f}%)")
-    print(f"  • Total Delivered: {total_delivered:,} ({total_delivered/total_requested*100:.2f}%)")
-    print(f"  • Total Failed: {total_failed:,} ({total_failed/total_requested*100:.2f}%)")
-    print(f"  • Total Pending: {total_pending:,} ({total_pending/total_requested*100:.2f}%)")
-    print(f"  • Total Not Sent: {total_not_sent:,} ({total_not_sent/total_requested*100:.2f}%)")
+    print(f"  • Total Submitted: {total_submitted:,} ({submitted_pct:.2f}%)")
+    print(f"  • Total Sent: {total_sent:,} ({sent_pct:.2f}%)")
+    print(f"  • Total Delivered: {total_delivered:,} ({delivered_pct:.2f}%)")
+    print(f"  • Total Failed: {total_failed:,} ({failed_pct:.2f}%)")
+    print(f"  • Total Pending: {total_pending:,} ({pending_pct:.2f}%)")
+    print(f"  • Total Not Sent: {total_not_sent:,} ({not_sent_pct:.2f}%)")
     
     # Key insights
     print(f"\n🔍 KEY INSIGHTS:")
-    print(f"  • Success Rate (Delivered/Requested): {total_delivered/total_requested*100:.2f}%")
-    print(f"  • Failure Rate: {total_failed/total_requested*100:.2f}%")
-    print(f"  • Processing Rate (Sent/Requested): {total_sent/total_requested*100:.2f}%")
+    print(f"  • Success Rate (Delivered/Requested): {delivered_pct:.2f}%")
+    print(f"  • Failure Rate: {failed_pct:.2f}%")
+    print(f"  • Processing Rate (Sent/Requested): {sent_pct:.2f}%")
     
     # Top performers
     print(f"\n🏆 TOP PERFORMERS:")
@@ -239,23 +445,389 @@ def generate_summary_report(df):
     origin_perf = df.groupby('origintype')['deliveredcount'].sum().sort_values(ascending=False)
     print(f"  • Top Origin Type: {origin_perf.index[0]} ({origin_perf.iloc[0]:,} delivered)")
 
+def summary_dir_for(file_path, output_dir):
+    """Summary directory of one source file; the path hash keeps same-named exports from different folders apart"""
+    source = os.path.abspath(file_path)
+    stem = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(output_dir, f"{stem}-{hashlib.sha1(source.encode('utf-8')).hexdigest()[:10]}")
+
+def materialize_daily_summary(df, file_path, output_dir):
+    """Write every dashboard grouping set of one daily file as Parquet, plus a manifest"""
+    summary_dir = summary_dir_for(file_path, output_dir)
+    os.makedirs(summary_dir, exist_ok=True)
+
+    # Summaries written before directories carried the path hash would be read twice by the dashboard
+    legacy_dir = os.path.join(output_dir, os.path.splitext(os.path.basename(file_path))[0])
+    legacy_manifest = os.path.join(legacy_dir, 'manifest.json')
+    if os.path.exists(legacy_manifest):
+        with open(legacy_manifest) as f:
+            if json.load(f).get('source_file') == os.path.abspath(file_path):
+                shutil.rmtree(legacy_dir)
+
+    measures = [col for col in MATERIALIZED_MEASURES if col in df.columns]
+    grouping_sets = {}
+    for name, keys in SUMMARY_GROUPING_SETS.items():
+        keys = ['as_of_date'] + keys
+        if any(col not in df.columns for col in keys):
+            continue
+        # Raw count sums (never rates) so summaries of several days can be added up again;
+        # missing keys are kept so every set still adds up to the file totals
+        grouped = df.groupby(keys, dropna=False, sort=False)
+        summary = grouped[measures].sum()
+        summary['record_count'] = grouped['record_count'].sum() if 'record_count' in df.columns else grouped.size()
+        summary.reset_index().to_parquet(os.path.join(summary_dir, f"{name}.parquet"), index=False)
+        grouping_sets[name] = len(summary)
+
+    dates = pd.Series(parse_as_of_dates(df['as_of_date'])).dropna()
+    manifest = {
+        'source_file': os.path.abspath(file_path),
+        'source_version': file_version(file_path),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'rows': int(df['record_count'].sum()) if 'record_count' in df.columns else len(df),
+        'dates': sorted({f"{day:%Y-%m-%d}" for day in dates}),
+        'grouping_sets': grouping_sets
+    }
+    with open(os.path.join(summary_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return summary_dir, manifest
+
+def is_materialized(file_path, output_dir):
+    """Whether the summary of this file is already up to date with the file on disk"""
+    manifest_path = os.path.join(summary_dir_for(file_path, output_dir), 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    return (manifest.get('source_file') == os.path.abspath(file_path)
+            and manifest.get('source_version') == file_version(file_path))
+
+def import_alert_rules():
+    """Import the alert rule engine shared with the dashboard package"""
+    import alert_rules
+    return alert_rules
+
+def evaluate_file_alerts(alerting, df, file_path):
+    """Fold one ingested file into the alert sums, run the rules over their windows and deliver what newly crossed"""
+    alert_rules = import_alert_rules()
+    start = time.perf_counter()
+    alerts = alert_rules.evaluate_ingest(alerting['state_dir'], alerting['rules'], df,
+                                          os.path.abspath(file_path), file_version(file_path))
+    print(f"    🚨 {len(alerts):,} new alerts from {len(alerting['rules']):,} rules "
+          f"({time.perf_counter() - start:.2f}s)")
+    for alert in alerts[:5]:
+        group = ', '.join(f"{col}={value}" for col, value in alert['group'].items())
+        print(f"      • {alert['rule']}: {group} {alert['metric']} {alert['value']:.2f}% "
+              f"{alert['op']} {alert['threshold']:g}%")
+    if len(alerts) > 5:
+        print(f"      • ... and {len(alerts) - 5:,} more")
+
+    try:
+        alert_rules.deliver_alerts(alerts, alerting['log_path'], alerting['webhook_url'])
+    except OSError as e:
+        print(f"    ⚠️ Alert webhook delivery failed: {str(e)}")
+    return alerts
+
+def materialize_files(file_paths, output_dir, force=False, compact=False, alerting=None):
+    """Materialize the daily summaries of several files, skipping ones that are already current"""
+    print(f"\n{'='*60}")
+    print(f"🗄️ MATERIALIZING DAILY SUMMARIES INTO '{output_dir}'")
+    print(f"{'='*60}")
+
+    for file_path in file_paths:
+        if not force and is_materialized(file_path, output_dir):
+            print(f"  • {file_path}: up to date, skipped")
+            continue
+        start = time.perf_counter()
+        df = load_and_analyze_data(file_path, compact=compact)
+        if alerting:
+            # Fail before writing anything, so a rerun still evaluates this file
+            import_alert_rules().check_rule_columns(alerting['rules'], df)
+        summary_dir, manifest = materialize_daily_summary(df, file_path, output_dir)
+        sizes = ', '.join(f"{name} {rows:,}" for name, rows in manifest['grouping_sets'].items())
+        print(f"  • {file_path}: {manifest['rows']:,} rows → {sizes} rows in '{summary_dir}' "
+              f"({time.perf_counter() - start:.2f}s)")
+        if alerting:
+            evaluate_file_alerts(alerting, df, file_path)
+
+def import_column_store():
+    """Import the column store module shared with the dashboard"""
+    import column_store
+    return column_store
+
+def ingest_store_files(file_paths, store_dir, compact=False, alerting=None):
+    """Append several daily files to the memory-mapped column store, replacing earlier ingests of the same file"""
+    column_store = import_column_store()
+    print(f"\n{'='*60}")
+    print(f"🗃️ INGESTING INTO COLUMN STORE '{store_dir}'")
+    print(f"{'='*60}")
+
+    for file_path in file_paths:
+        source, version = os.path.abspath(file_path), file_version(file_path)
+        replaced = column_store.read_manifest(store_dir)['sources'].get(source)
+        if replaced == version:
+            print(f"  • {file_path}: already ingested, skipped")
+            continue
+        start = time.perf_counter()
+        df = load_and_analyze_data(file_path, compact=compact)
+        if alerting:
+            # Fail before appending, so a rerun still evaluates this file
+            import_alert_rules().check_rule_columns(alerting['rules'], df)
+        rows = column_store.ingest_frame(store_dir, df, source, version)
+        print(f"  • {file_path}: {rows:,} rows {'replaced the earlier ingest' if replaced else 'appended'} "
+              f"({time.perf_counter() - start:.2f}s)")
+        if alerting:
+            evaluate_file_alerts(alerting, df, file_path)
+
+    manifest = column_store.read_manifest(store_dir)
+    print(f"  • Store: {column_store.live_rows(manifest):,} rows in {len(manifest['partitions']):,} date partitions")
+
+def load_from_store(store_dir, date_range=None, trace=None, footprints=None):
+    """Map the column store and decode the selected dates into a frame for the analyses"""
+    column_store = import_column_store()
+    with profile_stage(trace, 'open_store'):
+        store = column_store.open_store(store_dir)
+    if not column_store.live_rows(store['manifest']):
+        raise ValueError(f"Column store '{store_dir}' is empty")
+    with profile_stage(trace, 'query_store'):
+        df = column_store.query_frame(store, date_range=date_range)
+    if df.empty:
+        raise ValueError(f"Column store '{store_dir}' has no rows in the selected dates")
+    record_memory_footprint(footprints, 'df', df)
+
+    dates = column_store.store_dates(store)
+    print(f"🗃️ Column store '{store_dir}': {column_store.live_rows(store['manifest']):,} rows over {len(dates):,} days; "
+          f"{len(df):,} rows selected")
+    return df
+
+def partition_by_account(frame):
+    """Map each accountid to its contiguous block of a frame sorted by accountid"""
+    account_ids = frame['accountid'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, account_ids[1:] != account_ids[:-1]])
+    stops = np.r_[starts[1:], len(frame)]
+    return {account_ids[start]: frame.iloc[start:stop] for start, stop in zip(starts, stops)}
+
+def build_account_rollups(df):
+    """Funnel totals, template failures and country breakdown for every account in one pass each"""
+    df = df[df['accountid'].notna()]
+    measures = [col for col in MATERIALIZED_MEASURES if col in df.columns]
+
+    funnel = df.groupby('accountid')[measures].sum()
+    funnel['rows'] = df.groupby('accountid')['record_count'].sum() if 'record_count' in df.columns else df.groupby('accountid').size()
+    for col in measures[1:]:
+        funnel[col.replace('count', '_percentage')] = (funnel[col] / funnel['requestedcount'] * 100).fillna(0)
+
+    templates = df.groupby(['accountid', 'tmplid', 'tmplname'])[['failedcount', 'requestedcount']].sum().reset_index()
+    templates['failure_rate'] = (templates['failedcount'] / templates['requestedcount']) * 100
+    templates = templates.sort_values(['accountid', 'failedcount'], ascending=[True, False], kind='stable')
+
+    countries = df.groupby(['accountid', 'country'])[['requestedcount', 'deliveredcount', 'failedcount']].sum().reset_index()
+    countries['delivered_percentage'] = (countries['deliveredcount'] / countries['requestedcount']) * 100
+    countries = countries.sort_values(['accountid', 'requestedcount'], ascending=[True, False], kind='stable')
+
+    # Rollups are sorted by account, so each account's rows are one slice
+    return funnel, partition_by_account(templates.reset_index(drop=True)), partition_by_account(countries.reset_index(drop=True))
+
+def markdown_table(frame):
+    """Render a frame as a GitHub-flavored Markdown table"""
+    lines = ['| ' + ' | '.join(map(str, frame.columns)) + ' |', '|' + '---|' * len(frame.columns)]
+    for row in frame.itertuples(index=False):
+        cells = [(f"{value:.0f}" if value.is_integer() else f"{value:.2f}") if isinstance(value, float) else str(value) for value in row]
+        lines.append('| ' + ' | '.join(cells) + ' |')
+    return '\n'.join(lines)
+
+def write_account_report(task):
+    """Write one account's report in every requested format (runs in a worker process)"""
+    accountid, funnel, templates, countries, output_dir, formats = task
+    name = str(int(accountid)) if isinstance(accountid, (int, float, np.number)) and float(accountid).is_integer() else str(accountid)
+    path = os.path.join(output_dir, name)
+    templates = templates.drop(columns='accountid')
+    countries = countries.drop(columns='accountid')
+
+    if 'csv' in formats:
+        pd.DataFrame([funnel]).to_csv(f"{path}_funnel.csv", index=False)
+        templates.to_csv(f"{path}_templates.csv", index=False)
+        countries.to_csv(f"{path}_countries.csv", index=False)
+    if 'json' in formats:
+        # to_json writes undefined rates (NaN, inf from zero requested) as null, keeping the file strict JSON
+        with open(f"{path}.json", 'w') as f:
+            f.write(f'{{"accountid": {json.dumps(name)}, "funnel": {pd.Series(funnel, dtype=object).to_json()}, '
+                    f'"templates": {templates.to_json(orient="records")}, '
+                    f'"countries": {countries.to_json(orient="records")}}}')
+    if 'md' in formats:
+        with open(f"{path}.md", 'w') as f:
+            f.write(f"# Delivery report for account {name}\n\n")
+            f.write(f"## Funnel\n\n{markdown_table(pd.DataFrame(list(funnel.items()), columns=['metric', 'value']))}\n\n")
+            f.write(f"## Template failures\n\n{markdown_table(templates)}\n\n")
+            f.write(f"## Countries\n\n{markdown_table(countries)}\n")
+    return funnel['rows']
+
+def generate_account_reports(df, output_dir, formats=ACCOUNT_REPORT_FORMATS, workers=None):
+    """Partition by account once and write every account's report in a process pool"""
+    # Only this mode needs multiprocessing; keep it off the default start-up path
+    from concurrent.futures import ProcessPoolExecutor
+
+    print(f"\n{'='*60}")
+    print(f"📬 WRITING PER-ACCOUNT REPORTS INTO '{output_dir}'")
+    print(f"{'='*60}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    funnel, templates, countries = build_account_rollups(df)
+    empty = df.iloc[:0]
+    tasks = [
+        (accountid, totals, templates.get(accountid, empty), countries.get(accountid, empty), output_dir, formats)
+        for accountid, totals in zip(funnel.index, funnel.to_dict(orient='records'))
+    ]
+    print(f"  • Rolled up {len(df):,} rows into {len(tasks):,} account partitions in {time.perf_counter() - start:.2f}s")
+
+    workers = workers or os.cpu_count() or 1
+    # Batch small accounts together so pickling overhead does not dominate
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        written_rows = sum(pool.map(write_account_report, tasks, chunksize=chunksize))
+
+    seconds = time.perf_counter() - start
+    print(f"  • Wrote {len(tasks):,} reports ({', '.join(formats)}) covering {written_rows:,} rows "
+          f"with {workers} workers in {seconds:.2f}s")
+    print(f"  • Throughput: {len(tasks) / seconds:,.1f} accounts/s")
+    return len(tasks)
+
 def main():
     """Main analysis function"""
+    parser = argparse.ArgumentParser(description="Analyze delivery data and print the requested metrics")
+    parser.add_argument('files', nargs='*', default=['test 27th.csv'],
+                        help="CSV file to analyze (several daily files with --materialize)")
+    parser.add_argument('--profile', nargs='?', const='profile_trace.json', metavar='TRACE_PATH',
+                        help="Write a JSON trace of per-stage wall and CPU time (default: profile_trace.json)")
+    parser.add_argument('--memory-limit-mb', type=float, default=0,
+                        help="Switch to low-memory processing when loading would use more than 70%% of this limit")
+    parser.add_argument('--memory-report', action='store_true', help="Print per-stage RSS and frame footprints")
+    parser.add_argument('--materialize', metavar='OUTPUT_DIR',
+                        help="Write per-file Parquet summaries for the dashboard instead of printing the analysis")
+    parser.add_argument('--force', action='store_true', help="With --materialize, rebuild summaries that are up to date")
+    parser.add_argument('--account-reports', metavar='OUTPUT_DIR',
+                        help="Write one report per accountid instead of printing the analysis")
+    parser.add_argument('--report-formats', default=','.join(ACCOUNT_REPORT_FORMATS),
+                        help="Comma-separated per-account report formats (csv, json, md)")
+    parser.add_argument('--workers', type=int, help="Worker processes for --account-reports (default: CPU count)")
+    parser.add_argument('--compact', action='store_true',
+                        help="Pre-sum rows that share every grouped dimension before analyzing, materializing or ingesting")
+    parser.add_argument('--ingest-store', metavar='STORE_DIR',
+                        help="Append the files to a memory-mapped column store instead of printing the analysis")
+    parser.add_argument('--store', metavar='STORE_DIR', help="Analyze the history in a column store instead of a file")
+    parser.add_argument('--start-date', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+                        help="With --store, first as_of_date to analyze (YYYY-MM-DD)")
+    parser.add_argument('--end-date', type=lambda value: datetime.strptime(value, '%Y-%m-%d').date(),
+                        help="With --store, last as_of_date to analyze (YYYY-MM-DD)")
+    parser.add_argument('--alert-rules', metavar='RULES_JSON',
+                        help="Evaluate threshold rules on every file ingested with --ingest-store or --materialize")
+    parser.add_argument('--alert-state', metavar='STATE_DIR', default='alert_state',
+                        help="Per-day group sums and firing alerts kept between ingests (default: alert_state)")
+    parser.add_argument('--alert-log', metavar='JSONL_PATH', default='alerts.jsonl',
+                        help="File new alerts are appended to, one JSON object per line (default: alerts.jsonl)")
+    parser.add_argument('--alert-webhook', metavar='URL', help="Also POST each file's new alerts to this URL")
+    args = parser.parse_args()
+
+    alerting = None
+    if args.alert_rules:
+        if not (args.ingest_store or args.materialize):
+            parser.error("--alert-rules only applies with --ingest-store or --materialize")
+        try:
+            rules = import_alert_rules().load_rules(args.alert_rules)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot load alert rules: {str(e)}")
+        alerting = {'rules': rules, 'state_dir': args.alert_state, 'log_path': args.alert_log,
+                    'webhook_url': args.alert_webhook}
+
+    if args.materialize:
+        try:
+            materialize_files(args.files, args.materialize, args.force, args.compact, alerting)
+        except Exception as e:
+            print(f"❌ Error during materialization: {str(e)}")
+        return
+
+    if args.ingest_store:
+        try:
+            ingest_store_files(args.files, args.ingest_store, args.compact, alerting)
+        except Exception as e:
+            print(f"❌ Error during ingest: {str(e)}")
+        return
+
+    if len(args.files) > 1:
+        parser.error("analyze one file at a time; several files are only supported with --materialize "
+                     "or --ingest-store")
+    args.file = args.files[0]
+
+    if args.account_reports:
+        formats = [fmt.strip() for fmt in args.report_formats.split(',') if fmt.strip()]
+        unknown = sorted(set(formats) - set(ACCOUNT_REPORT_FORMATS))
+        if unknown:
+            parser.error(f"unknown report format(s): {', '.join(unknown)}")
+        try:
+            df = load_and_analyze_data(args.file, compact=args.compact)
+            generate_account_reports(df, args.account_reports, formats, args.workers)
+        except Exception as e:
+            print(f"❌ Error writing account reports: {str(e)}")
+        return
+
+    # Per-stage timings and memory; cheap enough to always record
+    trace = []
+    footprints = []
+    quality_report = []
+
     try:
+        # Pick the processing mode before loading anything large
+        low_memory = False
+        if args.memory_limit_mb > 0 and not args.store:
+            estimated_mb = estimate_load_memory_mb(args.file)
+            current_rss, _ = read_rss_mb()
+            low_memory = (current_rss or 0) + estimated_mb > args.memory_limit_mb * 0.7
+            if low_memory:
+                print(f"⚠️ Estimated footprint ~{estimated_mb:,.0f} MB is close to the "
+                      f"{args.memory_limit_mb:,.0f} MB limit; switching to low-memory processing")
+
         # Load data
-        df = load_and_analyze_data()
+        if args.store:
+            date_range = None
+            if args.start_date or args.end_date:
+                date_range = (args.start_date or datetime.min.date(), args.end_date or datetime.max.date())
+            df = load_from_store(args.store, date_range, trace, footprints)
+        else:
+            df = load_and_analyze_data(args.file, trace, low_memory, footprints, quality_report, args.compact)
+            print_quality_report(quality_report)
         
         # Perform all analyses
-        origin_analysis = analyze_origin_type_filter(df)
-        pricing_analysis = analyze_pricing_model_metrics(df)
-        pending_analysis = analyze_pending_and_not_sent(df)
-        country_analysis = analyze_country_metrics(df)
-        account_failures = analyze_account_failures(df)
-        template_failures = analyze_template_failures(df)
-        pricing_delivery = analyze_pricing_delivery_table(df)
+        with profile_stage(trace, 'analyze_origin_type_filter'):
+            origin_analysis = analyze_origin_type_filter(df)
+        with profile_stage(trace, 'analyze_pricing_model_metrics'):
+            pricing_analysis = analyze_pricing_model_metrics(df)
+        with profile_stage(trace, 'analyze_pending_and_not_sent'):
+            pending_analysis = analyze_pending_and_not_sent(df)
+        with profile_stage(trace, 'analyze_country_metrics'):
+            country_analysis = analyze_country_metrics(df)
+        with profile_stage(trace, 'analyze_account_failures'):
+            account_failures = analyze_account_failures(df)
+        with profile_stage(trace, 'analyze_template_failures'):
+            template_failures = analyze_template_failures(df)
+        with profile_stage(trace, 'analyze_pricing_delivery_table'):
+            pricing_delivery = analyze_pricing_delivery_table(df)
+        with profile_stage(trace, 'analyze_failure_anomalies'):
+            account_anomalies, template_anomalies = analyze_failure_anomalies(df)
+        with profile_stage(trace, 'analyze_funnel_conversion'):
+            funnel_overall, funnels = analyze_funnel_conversion(df)
+        
+        for name, result in [('origin_analysis', origin_analysis), ('pricing_analysis', pricing_analysis),
+                             ('pending_analysis', pending_analysis), ('country_analysis', country_analysis),
+                             ('account_failures', account_failures), ('template_failures', template_failures),
+                             ('pricing_delivery', pricing_delivery), ('account_anomalies', account_anomalies),
+                             ('template_anomalies', template_anomalies), ('funnel_overall', funnel_overall)]:
+            record_memory_footprint(footprints, name, result)
+        for dimension, funnel in funnels.items():
+            record_memory_footprint(footprints, f"funnel_{dimension}", funnel)
         
         # Generate summary report
-        generate_summary_report(df)
+        with profile_stage(trace, 'generate_summary_report'):
+            generate_summary_report(df)
         
         print(f"\n{'='*60}")
         print("✅ ANALYSIS COMPLETE!")
@@ -263,9 +835,16 @@ def main():
         print("📊 All requested metrics have been analyzed and displayed above.")
         print("💡 Use this enhanced Streamlit dashboard for interactive visualization.")
         
+        if args.memory_report:
+            print_memory_report(trace, footprints)
+        
+        if args.profile:
+            write_profile_trace(trace, args.profile, args.store or args.file, footprints)
+        
     except Exception as e:
         print(f"❌ Error during analysis: {str(e)}")
-        print("Please check if the file 'test 27th.csv' is in the current directory.")
+        if not args.store:
+            print(f"Please check if the file '{args.file}' is in the current directory.")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
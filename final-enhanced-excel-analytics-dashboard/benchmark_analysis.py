@@ -0,0 +1,176 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit-package'))
+
+import analyze_test_data_fixed as cli
+import enhanced_streamlit_app as dashboard
+from streamlit.logger import set_log_level
+
+# Running outside `streamlit run` makes every cached call warn about the missing runtime
+set_log_level('error')
+
+def dashboard_load(file_path):
+    """Load a file through the dashboard's upload path"""
+    with open(file_path, 'rb') as uploaded_file:
+        return dashboard.load_and_process_data(uploaded_file)
+
+def build_stages(file_path):
+    """List the (name, function) pairs to benchmark; analysis stages receive the loaded frame"""
+    load_stages = [
+        ('cli.load_and_analyze_data', lambda df: cli.load_and_analyze_data(file_path)),
+        ('dashboard.load_and_process_data', lambda df: dashboard_load(file_path))
+    ]
+    analysis_stages = [
+        ('cli.analyze_origin_type_filter', cli.analyze_origin_type_filter),
+        ('cli.analyze_pricing_model_metrics', cli.analyze_pricing_model_metrics),
+        ('cli.analyze_pending_and_not_sent', cli.analyze_pending_and_not_sent),
+        ('cli.analyze_country_metrics', cli.analyze_country_metrics),
+        ('cli.analyze_account_failures', cli.analyze_account_failures),
+        ('cli.analyze_template_failures', cli.analyze_template_failures),
+        ('cli.analyze_pricing_delivery_table', cli.analyze_pricing_delivery_table),
+        ('cli.analyze_failure_anomalies', cli.analyze_failure_anomalies),
+        ('cli.analyze_funnel_conversion', cli.analyze_funnel_conversion),
+        ('cli.generate_summary_report', cli.generate_summary_report),
+        ('dashboard.calculate_delivery_metrics', dashboard.calculate_delivery_metrics),
+        ('dashboard.analyze_pricing_model_metrics', dashboard.analyze_pricing_model_metrics),
+        ('dashboard.analyze_country_metrics', dashboard.analyze_country_metrics),
+        ('dashboard.analyze_account_failures', dashboard.analyze_account_failures),
+        ('dashboard.analyze_template_failures', dashboard.analyze_template_failures),
+        ('dashboard.analyze_pricing_delivery_table', dashboard.analyze_pricing_delivery_table),
+        ('dashboard.compute_funnel', lambda df: dashboard.compute_funnel(df, ['country'])),
+        ('dashboard.build_hierarchical_rollups', dashboard.build_hierarchical_rollups),
+        ('dashboard.build_filter_indexes', dashboard.build_filter_indexes),
+        ('dashboard.build_daily_buckets', lambda df: dashboard.build_daily_buckets(df, 'country'))
+    ]
+    return load_stages, analysis_stages
+
+def run_stage(func, df):
+    """Run one stage with its console output suppressed and any Streamlit cache cleared"""
+    cached = getattr(func, 'clear', None)
+    if cached is not None:
+        cached()
+    with contextlib.redirect_stdout(io.StringIO()):
+        return func(df)
+
+def measure_stage(func, df, repeat):
+    """Best and median of N wall times, then one traced run for peak Python-heap allocation"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_stage(func, df)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run_stage(func, df)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'seconds': min(timings), 'median_seconds': statistics.median(timings), 'peak_mb': peak / 1024 ** 2}
+
+def benchmark_file(file_path, repeat):
+    """Benchmark every load path and analysis against one data file"""
+    print(f"\n{'='*60}")
+    print(f"⏱️ BENCHMARKING '{file_path}'")
+    print(f"{'='*60}")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = cli.load_and_analyze_data(file_path)
+    print(f"📈 Rows: {len(df):,}")
+
+    results = {}
+    load_stages, analysis_stages = build_stages(file_path)
+    for name, func in load_stages + analysis_stages:
+        results[name] = measure_stage(func, df, repeat)
+        print(f"  • {name:<45} {results[name]['seconds']:>9.3f}s (median {results[name]['median_seconds']:.3f}s) "
+              f"{results[name]['peak_mb']:>10.1f} MB")
+
+    return {'rows': len(df), 'stages': results}
+
+def find_regressions(results, baseline, tolerance, min_stage_ms=50, min_delta_ms=10, min_delta_mb=1.0):
+    """Compare results against stored baselines and list stages that got slower or hungrier
+
+    Times compare medians where both runs recorded them. Stages faster than min_stage_ms and
+    changes smaller than min_delta_ms / min_delta_mb are timer and allocator noise, not regressions.
+    """
+    regressions = []
+    for file_key, result in results.items():
+        base_stages = baseline.get(file_key, {}).get('stages', {})
+        for stage, current in result['stages'].items():
+            base = base_stages.get(stage)
+            if base is None:
+                continue
+            time_metric = 'median_seconds' if 'median_seconds' in base and 'median_seconds' in current else 'seconds'
+            for metric in (time_metric, 'peak_mb'):
+                if metric == 'peak_mb':
+                    significant = current[metric] - base[metric] >= min_delta_mb
+                else:
+                    significant = (base[metric] * 1000 >= min_stage_ms
+                                   and (current[metric] - base[metric]) * 1000 >= min_delta_ms)
+                if significant and base[metric] > 0 and current[metric] > base[metric] * (1 + tolerance):
+                    regressions.append({
+                        'file': file_key,
+                        'stage': stage,
+                        'metric': metric,
+                        'baseline': base[metric],
+                        'current': current[metric],
+                        'change_percentage': (current[metric] / base[metric] - 1) * 100
+                    })
+    return regressions
+
+def main():
+    """Run the benchmark suite"""
+    parser = argparse.ArgumentParser(description="Time and memory-profile every load path and analysis")
+    parser.add_argument('files', nargs='*', default=['test 27th.csv'], help="Delivery data files to benchmark")
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per stage (best and median are kept)")
+    parser.add_argument('--baseline', default=os.path.join('benchmarks', 'baseline.json'), help="Baseline JSON path")
+    parser.add_argument('--save-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Allowed slowdown/growth before a regression is reported")
+    parser.add_argument('--min-stage-ms', type=float, default=50,
+                        help="Ignore timing changes of stages whose baseline is faster than this")
+    parser.add_argument('--min-delta-ms', type=float, default=10, help="Ignore slowdowns smaller than this")
+    parser.add_argument('--min-delta-mb', type=float, default=1.0, help="Ignore peak-memory growth smaller than this")
+    args = parser.parse_args()
+
+    results = {os.path.basename(path): benchmark_file(path, args.repeat) for path in args.files}
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    regressions = find_regressions(results, baseline, args.tolerance,
+                                   args.min_stage_ms, args.min_delta_ms, args.min_delta_mb)
+
+    print(f"\n{'='*60}")
+    print("📋 REGRESSION REPORT")
+    print(f"{'='*60}")
+    if not baseline:
+        print(f"ℹ️ No baseline found at '{args.baseline}'")
+    elif regressions:
+        for r in regressions:
+            print(f"  ❌ {r['file']} {r['stage']} {r['metric']}: "
+                  f"{r['baseline']:.3f} → {r['current']:.3f} ({r['change_percentage']:+.1f}%)")
+    else:
+        print(f"✅ No regressions beyond {args.tolerance:.0%} tolerance "
+              f"(ignoring stages under {args.min_stage_ms:g} ms and changes under {args.min_delta_ms:g} ms / "
+              f"{args.min_delta_mb:g} MB)")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or '.', exist_ok=True)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"💾 Baseline saved to '{args.baseline}'")
+
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
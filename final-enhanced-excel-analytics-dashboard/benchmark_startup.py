@@ -0,0 +1,69 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+APPS = {
+    'enhanced_streamlit_app': os.path.join(ROOT, 'streamlit-package', 'enhanced_streamlit_app.py'),
+    'streamlit_app': os.path.join(ROOT, 'streamlit-package', 'streamlit_app.py')
+}
+
+# Runs in a fresh interpreter: Streamlit itself is loaded first, as it is in a running server, so the
+# timed part is the app script's own imports plus its upload-screen run (bare mode, no file uploaded).
+# `streamlit run` puts the script's directory on sys.path for its sibling modules; do the same here
+FIRST_PAINT_SNIPPET = """
+import os, runpy, sys, time
+sys.path.insert(0, os.path.dirname(sys.argv[1]))
+import streamlit
+from streamlit import config
+from streamlit.logger import set_log_level
+config.set_option('logger.level', 'error')
+set_log_level('error')
+start = time.perf_counter()
+runpy.run_path(sys.argv[1], run_name='__main__')
+print(time.perf_counter() - start)
+"""
+
+def time_cli_startup():
+    """Wall time of a fresh `analyze_test_data_fixed.py --help`"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(ROOT, 'analyze_test_data_fixed.py'), '--help'],
+                   check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def time_first_paint(app_path):
+    """Time of the first script run (upload screen) of an app in a fresh interpreter"""
+    result = subprocess.run([sys.executable, '-c', FIRST_PAINT_SNIPPET, app_path],
+                            check=True, capture_output=True, text=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+def summarize(timings):
+    """Median and best of repeated timings, in milliseconds"""
+    return {'median_ms': statistics.median(timings) * 1000, 'min_ms': min(timings) * 1000, 'runs': len(timings)}
+
+def main():
+    """Run the start-up benchmark"""
+    parser = argparse.ArgumentParser(description="Time CLI start-up and time to first paint of the dashboards")
+    parser.add_argument('--repeat', type=int, default=5, help="Fresh-process runs per measurement")
+    parser.add_argument('--output', help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    print(f"🚀 Start-up benchmark ({args.repeat} fresh processes per measurement)")
+    results = {'cli_startup': summarize([time_cli_startup() for _ in range(args.repeat)])}
+    for name, path in APPS.items():
+        results[f"{name}_first_paint"] = summarize([time_first_paint(path) for _ in range(args.repeat)])
+
+    for name, result in results.items():
+        print(f"  • {name:<40} median {result['median_ms']:>8.1f} ms   best {result['min_ms']:>8.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to '{args.output}'")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import pandas as pd
+import numpy as np
+
+COLUMNS = ['as_of_date', 'accountid', 'wabanumber', 'tmplid', 'tmplname', 'country', 'sourcesystem',
+           'origintype', 'pricingtype', 'pricingmodel', 'requestedcount', 'submittedcount', 'sentcount',
+           'deliveredcount', 'readcount', 'failedcount', 'pendingcount', 'notsentcount']
+
+COUNTRIES = ['India', 'United Arab Emirates', 'United Kingdom', 'Australia', 'Saudi Arabia', 'Qatar',
+             'Ireland', 'Kuwait', 'Germany', 'Nepal', 'Malaysia', 'Hong Kong', 'New Zealand', 'Spain',
+             'Russia', 'Austria', 'Bulgaria', 'Afghanistan', 'United States', 'Canada', 'Singapore',
+             'France', 'Italy', 'Netherlands', 'Oman', 'Bahrain', 'Sri Lanka', 'Bangladesh', 'Indonesia',
+             'Thailand', 'Philippines', 'South Africa', 'Nigeria', 'Kenya', 'Brazil', 'Mexico', 'Japan']
+
+TEMPLATE_PREFIXES = ['otp_traffic', 'dineout', 'instamart', 'campaign', 'im_blck', 'soc', 'reliability',
+                     'swiggy_one', 'cbccapp', 'mb_claimed', 'intervention', 'surge', 'fp_com']
+
+ORIGIN_TYPES = ['marketing_lite', 'ML', 'Utility (billable)', 'ML_PF', 'authentication', 'UC',
+                'Utility (non-billable)', 'UC_PF', 'marketing', 'AC', 'service']
+PRICING_TYPES = ['regular', 'NA', 'free_customer_service', 'free_entry_point']
+PRICING_MODELS = ['PMP', 'CBP']
+SOURCE_SYSTEMS = ['ENT', 'SMB']
+
+def parse_row_count(value):
+    """Parse row counts such as 1342, 1M or 100M"""
+    value = value.strip().upper()
+    multiplier = {'K': 1_000, 'M': 1_000_000, 'B': 1_000_000_000}.get(value[-1], 1)
+    return int(float(value.rstrip('KMB')) * multiplier)
+
+def zipf_weights(size, skew):
+    """Rank-based weights where the i-th most common value has weight 1 / i**skew"""
+    weights = 1.0 / np.arange(1, size + 1) ** skew
+    return weights / weights.sum()
+
+def build_dimensions(accounts, templates, countries, days, skew, rng):
+    """Build the dimension dictionaries shared by every chunk"""
+    country_names = COUNTRIES[:countries] + [f"Country {i}" for i in range(len(COUNTRIES), countries)]
+    dates = pd.date_range('2025-07-25', periods=days, freq='-1D')[::-1]
+
+    # Every template belongs to one account; busy accounts own more templates
+    template_account = rng.choice(accounts, size=templates, p=zipf_weights(accounts, skew))
+    prefixes = np.array(TEMPLATE_PREFIXES)[rng.integers(0, len(TEMPLATE_PREFIXES), templates)]
+
+    return {
+        'dates': np.array([f"{d:%B} {d.day}, {d.year}" for d in dates]),
+        'accountid': 2000200000 + np.arange(accounts),
+        'wabanumber': 918068000000 + rng.integers(0, 1_000_000, accounts),
+        'sourcesystem': np.array(SOURCE_SYSTEMS)[rng.integers(0, len(SOURCE_SYSTEMS), accounts)],
+        'tmplid': 7000000 + rng.choice(10 * templates, size=templates, replace=False),
+        'tmplname': np.char.add(prefixes, np.char.add('_', np.arange(templates).astype(str))),
+        'template_account': template_account,
+        'countries': np.array(country_names),
+        'template_weights': zipf_weights(templates, skew),
+        'country_weights': zipf_weights(countries, skew * 2)
+    }
+
+def generate_chunk(rows, dims, rng):
+    """Generate one chunk of delivery rows with a consistent message funnel"""
+    template = rng.choice(len(dims['tmplid']), size=rows, p=dims['template_weights'])
+    account = dims['template_account'][template]
+
+    requested = np.ceil(rng.lognormal(mean=2.0, sigma=1.5, size=rows)).astype(np.int64)
+    submitted = rng.binomial(requested, 0.85)
+    sent = rng.binomial(submitted, 0.6)
+    delivered = rng.binomial(sent, 0.9)
+    read = rng.binomial(delivered, 0.5)
+    pending = rng.binomial(submitted - sent, 0.05)
+
+    return pd.DataFrame({
+        'as_of_date': dims['dates'][rng.integers(0, len(dims['dates']), rows)],
+        'accountid': dims['accountid'][account],
+        'wabanumber': dims['wabanumber'][account].astype(float),
+        'tmplid': dims['tmplid'][template],
+        'tmplname': dims['tmplname'][template],
+        'country': dims['countries'][rng.choice(len(dims['countries']), size=rows, p=dims['country_weights'])],
+        'sourcesystem': dims['sourcesystem'][account],
+        'origintype': np.array(ORIGIN_TYPES)[rng.integers(0, len(ORIGIN_TYPES), rows)],
+        'pricingtype': np.array(PRICING_TYPES)[rng.choice(len(PRICING_TYPES), size=rows, p=[0.5, 0.45, 0.04, 0.01])],
+        'pricingmodel': np.array(PRICING_MODELS)[rng.choice(len(PRICING_MODELS), size=rows, p=[0.99, 0.01])],
+        'requestedcount': requested,
+        'submittedcount': submitted,
+        'sentcount': sent,
+        'deliveredcount': delivered,
+        'readcount': read,
+        'failedcount': submitted - sent - pending,
+        'pendingcount': pending,
+        'notsentcount': requested - submitted
+    }, columns=COLUMNS)
+
+def generate_delivery_file(output, rows, accounts=50, templates=5000, countries=120, days=30,
+                           skew=1.2, seed=27, chunk_size=1_000_000):
+    """Write a synthetic delivery file with the test 27th.csv schema in fixed-size chunks"""
+    rng = np.random.default_rng(seed)
+    dims = build_dimensions(accounts, templates, countries, days, skew, rng)
+
+    written = 0
+    while written < rows:
+        chunk = generate_chunk(min(chunk_size, rows - written), dims, rng)
+        chunk.to_csv(output, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += len(chunk)
+        print(f"  • {written:,} / {rows:,} rows written")
+
+    return written
+
+def main():
+    """Generate synthetic delivery data"""
+    parser = argparse.ArgumentParser(description="Generate synthetic delivery data with the test 27th.csv schema")
+    parser.add_argument('--rows', default='1M', help="Number of rows, e.g. 1M, 10M or 100M")
+    parser.add_argument('--accounts', type=int, default=50, help="Number of distinct accounts")
+    parser.add_argument('--templates', type=int, default=5000, help="Number of distinct templates")
+    parser.add_argument('--countries', type=int, default=120, help="Number of distinct countries")
+    parser.add_argument('--days', type=int, default=30, help="Number of distinct as_of_date values")
+    parser.add_argument('--skew', type=float, default=1.2, help="Zipf exponent for account/template/country popularity (0 = uniform)")
+    parser.add_argument('--seed', type=int, default=27, help="Random seed")
+    parser.add_argument('--chunk-size', type=int, default=1_000_000, help="Rows generated and written per chunk")
+    parser.add_argument('--output', help="Output CSV path (default: synthetic_<rows>.csv)")
+    args = parser.parse_args()
+
+    rows = parse_row_count(args.rows)
+    output = args.output or f"synthetic_{args.rows.strip().upper()}.csv"
+
+    print(f"📊 Generating {rows:,} rows into '{output}'...")
+    generate_delivery_file(output, rows, args.accounts, args.templates, args.countries, args.days,
+                           args.skew, args.seed, args.chunk_size)
+    print(f"✅ Done!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import json
+import os
+import urllib.request
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from delivery_pipeline import parse_as_of_dates, write_json_atomic
+
+# Ratio metrics a rule can name, as (numerator, denominator) count columns; values are percentages
+ALERT_METRICS = {
+    'failure_rate': ('failedcount', 'requestedcount'),
+    'pending_share': ('pendingcount', 'requestedcount'),
+    'not_sent_share': ('notsentcount', 'requestedcount'),
+    'delivery_rate': ('deliveredcount', 'requestedcount'),
+    'read_rate': ('readcount', 'deliveredcount')
+}
+RULE_OPERATORS = {'>': np.greater, '>=': np.greater_equal, '<': np.less, '<=': np.less_equal}
+
+def _state_path(state_dir):
+    return os.path.join(state_dir, 'alert_state.json')
+
+def _sums_file(grouping, generation):
+    return f"sums__{grouping}.{generation}.parquet"
+
+def _plain(value):
+    """JSON-friendly group key value (missing becomes None)"""
+    if isinstance(value, np.generic):
+        value = value.item()
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+def load_rules(rules_path):
+    """Read and validate the declarative threshold rules of a JSON file
+
+    Each rule is {"name", "group_by": [columns], "metric": one of ALERT_METRICS (or
+    "numerator"/"denominator" count columns), "op": ">", "threshold": percent,
+    "min_volume": smallest denominator sum worth alerting on, "window_days": days of data the
+    metric covers, ending at the newest as_of_date (default 1), "match": {column: value}}.
+    Rules without "match" apply to every group; "match" pins a rule to specific groups.
+    """
+    with open(rules_path) as f:
+        payload = json.load(f)
+    rules = payload['rules'] if isinstance(payload, dict) else payload
+
+    validated, names = [], set()
+    for position, rule in enumerate(rules):
+        name = rule.get('name') or f"rule_{position + 1}"
+        if name in names:
+            raise ValueError(f"Duplicate alert rule name '{name}'")
+        names.add(name)
+        if not rule.get('group_by'):
+            raise ValueError(f"Alert rule '{name}' needs a non-empty group_by")
+        if 'metric' in rule:
+            if rule['metric'] not in ALERT_METRICS:
+                raise ValueError(f"Alert rule '{name}' has unknown metric '{rule['metric']}' "
+                                 f"(known: {', '.join(ALERT_METRICS)})")
+            numerator, denominator = ALERT_METRICS[rule['metric']]
+        elif 'numerator' in rule and 'denominator' in rule:
+            numerator, denominator = rule['numerator'], rule['denominator']
+        else:
+            raise ValueError(f"Alert rule '{name}' needs a metric or a numerator and denominator")
+        op = rule.get('op', '>')
+        if op not in RULE_OPERATORS:
+            raise ValueError(f"Alert rule '{name}' has unknown op '{op}' (known: {', '.join(RULE_OPERATORS)})")
+        if 'threshold' not in rule:
+            raise ValueError(f"Alert rule '{name}' needs a threshold")
+        match = rule.get('match') or {}
+        if any(col not in rule['group_by'] for col in match):
+            raise ValueError(f"Alert rule '{name}' matches on columns outside its group_by")
+        if any(value is not None and not isinstance(value, (str, int, float, bool)) for value in match.values()):
+            raise ValueError(f"Alert rule '{name}' match values must be strings, numbers or null")
+        window_days = rule.get('window_days', 1)
+        if isinstance(window_days, bool) or not isinstance(window_days, int) or window_days < 1:
+            raise ValueError(f"Alert rule '{name}' window_days must be a positive whole number of days")
+
+        validated.append({
+            'name': name,
+            'group_by': list(rule['group_by']),
+            'metric': rule.get('metric', f"{numerator}/{denominator}"),
+            'numerator': numerator,
+            'denominator': denominator,
+            'op': op,
+            'threshold': float(rule['threshold']),
+            'min_volume': float(rule.get('min_volume', 0)),
+            'window_days': window_days,
+            'match': match
+        })
+    return validated
+
+def coerce_match_value(value, dtype):
+    """Convert a rule's match value to a column's dtype; raise ValueError when no row could ever equal it"""
+    if value is None:
+        return np.nan if pd.api.types.is_numeric_dtype(dtype) else None
+    if pd.api.types.is_bool_dtype(dtype):
+        return value
+    if pd.api.types.is_numeric_dtype(dtype):
+        try:
+            number = pd.to_numeric(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{value}' is not a number") from None
+        if pd.api.types.is_integer_dtype(dtype):
+            if not float(number).is_integer():
+                raise ValueError(f"{value} is not a whole number")
+            return int(number)
+        return float(number)
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        try:
+            return pd.Timestamp(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"'{value}' is not a date") from None
+    # Text columns compare as text; object columns keep the value as written
+    return str(value) if pd.api.types.is_string_dtype(dtype) and not pd.api.types.is_object_dtype(dtype) else value
+
+def check_rule_columns(rules, df):
+    """Raise ValueError when the rules group on or sum columns the data does not have, or match values of the wrong type"""
+    # Sums are kept per as_of_date, which every rule's window is measured in
+    needed = {'as_of_date'} | {col for rule in rules for col in rule['group_by'] + [rule['numerator'], rule['denominator']]}
+    missing = sorted(needed - set(df.columns))
+    if missing:
+        raise ValueError(f"Alert rules need columns the data does not have: {', '.join(missing)}")
+    for rule in rules:
+        for col, value in rule['match'].items():
+            try:
+                coerce_match_value(value, df[col].dtype)
+            except ValueError as error:
+                raise ValueError(f"Alert rule '{rule['name']}' matches {col} on {error} "
+                                 f"(column is {df[col].dtype})") from None
+
+def read_alert_state(state_dir):
+    """Return the ingested source versions, the (rule, group) pairs currently firing and the committed daily-sum files"""
+    if not os.path.exists(_state_path(state_dir)):
+        return {'sources': {}, 'firing': {}, 'generation': 0, 'sums': {}, 'as_of_date': None}
+    with open(_state_path(state_dir)) as f:
+        state = json.load(f)
+    if isinstance(state['sources'], list):
+        # State written before sums were kept per day: its all-time sums cannot be split into days
+        state.update(sources={}, sums={}, as_of_date=None)
+    return state
+
+def update_daily_sums(state_dir, sums_file, df, days, source, keys, measures, keep_from):
+    """Replace one source's per-day, per-group sums with this ingest's in memory
+
+    The stored rows of the source for the days the frame covers are dropped before its new sums
+    are added, so a re-exported day replaces its earlier contribution. Days before keep_from can
+    no longer enter any rule's window and are dropped. Returns the updated sums for the caller to
+    persist once the ingest commits.
+    """
+    delta = df.assign(_day=days).groupby(['_day'] + keys, dropna=False, sort=False)[measures].sum().reset_index()
+    delta.insert(0, '_source', source)
+    path = os.path.join(state_dir, sums_file) if sums_file else None
+    stored = pd.read_parquet(path) if path and os.path.exists(path) else delta.iloc[:0]
+    # Measures a newly added rule needs start from zero at its first ingest
+    columns = ['_source', '_day'] + keys
+    stored = stored.reindex(columns=columns + sorted(set(stored.columns[len(columns):]) | set(measures)), fill_value=0)
+
+    if source is not None:
+        stored = stored[~((stored['_source'] == source) & stored['_day'].isin(delta['_day'].dropna()))]
+    updated = pd.concat([stored, delta], ignore_index=True)
+    return updated[updated['_day'] >= keep_from].reset_index(drop=True)
+
+def window_totals(sums, keys, measures, as_of, window_days):
+    """Per-group totals of the daily sums over the window_days days ending at as_of"""
+    in_window = (sums['_day'] > as_of - pd.Timedelta(days=window_days)) & (sums['_day'] <= as_of)
+    return sums[in_window].groupby(keys, dropna=False, sort=False)[measures].sum().reset_index()
+
+def _evaluate_grouping(totals, rules, keys):
+    """Vectorized evaluation of every rule of one grouping and window against the groups' window totals"""
+    pairs = sorted({(rule['numerator'], rule['denominator']) for rule in rules})
+    numerators = totals[[num for num, _ in pairs]].to_numpy(dtype=np.float64)
+    volumes = totals[[den for _, den in pairs]].to_numpy(dtype=np.float64)
+    # One (groups x metrics) ratio matrix; an empty denominator leaves the ratio undefined
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = np.where(volumes > 0, numerators / volumes * 100, np.nan)
+
+    groups = totals[keys].assign(_group=np.arange(len(totals)))
+    rule_table = pd.DataFrame({
+        '_rule': np.arange(len(rules)),
+        '_metric': [pairs.index((rule['numerator'], rule['denominator'])) for rule in rules],
+        '_threshold': [rule['threshold'] for rule in rules],
+        '_min_volume': [rule['min_volume'] for rule in rules],
+        '_op': [rule['op'] for rule in rules]
+    })
+
+    # Rules pinned to the same match columns join the groups on them; the rest apply to every group
+    candidates = []
+    match_sets = {}
+    for position, rule in enumerate(rules):
+        match_sets.setdefault(tuple(sorted(rule['match'])), []).append(position)
+    for match_columns, positions in match_sets.items():
+        table = rule_table.iloc[positions]
+        if match_columns:
+            pinned = pd.DataFrame([[coerce_match_value(rules[p]['match'][col], groups[col].dtype)
+                                    for col in match_columns] for p in positions],
+                                  columns=list(match_columns), index=table.index)
+            pinned = pinned.astype({col: groups[col].dtype for col in match_columns if pinned[col].notna().all()})
+            table = pd.concat([table, pinned], axis=1)
+            candidates.append(groups.merge(table, on=list(match_columns)))
+        else:
+            candidates.append(groups.merge(table, how='cross'))
+    candidates = pd.concat(candidates, ignore_index=True)
+
+    group_ids = candidates['_group'].to_numpy()
+    metric_ids = candidates['_metric'].to_numpy()
+    values = ratios[group_ids, metric_ids]
+    thresholds = candidates['_threshold'].to_numpy()
+    fired = np.zeros(len(candidates), dtype=bool)
+    for op, compare in RULE_OPERATORS.items():
+        selected = (candidates['_op'] == op).to_numpy()
+        fired[selected] = compare(values[selected], thresholds[selected])
+    fired &= volumes[group_ids, metric_ids] >= candidates['_min_volume'].to_numpy()
+    return candidates, values, volumes[group_ids, metric_ids], numerators[group_ids, metric_ids], fired
+
+def evaluate_ingest(state_dir, rules, df, source=None, version=None):
+    """Fold one ingested frame into the daily sums and return alerts for rules that newly crossed
+
+    Sums are kept per source file and as_of_date, so ingesting a file again replaces its earlier
+    contribution for the days it covers; the same source at the same version is skipped. Every
+    rule is evaluated over its window_days days ending at the newest day ingested so far, so a
+    (rule, group) pair alerts once when it crosses its threshold and clears once its window drops
+    back below (or holds no data). The updated sums are written under a new generation and only
+    become current when alert_state.json is replaced, so an ingest that fails part-way leaves the
+    sums and the state as they were.
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    state = read_alert_state(state_dir)
+    if source is not None and version is not None and state['sources'].get(source) == version:
+        return []
+
+    check_rule_columns(rules, df)
+
+    days = parse_as_of_dates(df['as_of_date'])
+    ingest_latest = days[~np.isnat(days)].max() if (~np.isnat(days)).any() else None
+    latest = max(filter(None, [pd.Timestamp(state['as_of_date']) if state['as_of_date'] else None,
+                               pd.Timestamp(ingest_latest) if ingest_latest is not None else None]), default=None)
+    as_of_date = f"{latest:%Y-%m-%d}" if latest is not None else None
+    evaluated_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    by_grouping = {}
+    for rule in rules:
+        by_grouping.setdefault(tuple(rule['group_by']), []).append(rule)
+
+    firing = {name: set(groups) for name, groups in state['firing'].items()}
+    generation = state.get('generation', 0) + 1
+    sums_files = dict(state.get('sums', {}))
+    staged = {}
+    alerts = []
+    for keys, grouping_rules in by_grouping.items():
+        keys = list(keys)
+        grouping = '__'.join(keys)
+        measures = sorted({col for rule in grouping_rules for col in (rule['numerator'], rule['denominator'])})
+        longest = max(rule['window_days'] for rule in grouping_rules)
+        keep_from = latest - pd.Timedelta(days=longest - 1) if latest is not None else pd.Timestamp.max
+        sums = update_daily_sums(state_dir, sums_files.get(grouping), df, days, source, keys, measures, keep_from)
+        staged[grouping] = sums
+
+        by_window = {}
+        for rule in grouping_rules:
+            by_window.setdefault(rule['window_days'], []).append(rule)
+        for window_days, window_rules in by_window.items():
+            totals = window_totals(sums, keys, measures, latest, window_days) if latest is not None else sums.iloc[:0]
+            now_firing = {rule['name']: set() for rule in window_rules}
+            if len(totals):
+                candidates, values, volumes, numerators, fired = _evaluate_grouping(totals, window_rules, keys)
+                rule_ids = candidates['_rule'].to_numpy()
+                key_values = candidates[keys].to_numpy(dtype=object)
+                for i in np.flatnonzero(fired):
+                    rule = window_rules[rule_ids[i]]
+                    group = {col: _plain(value) for col, value in zip(keys, key_values[i])}
+                    group_key = json.dumps(list(group.values()), default=str)
+                    now_firing[rule['name']].add(group_key)
+                    if group_key in firing.get(rule['name'], ()):
+                        continue
+                    alerts.append({
+                        'rule': rule['name'],
+                        'metric': rule['metric'],
+                        'group': group,
+                        'value': round(float(values[i]), 4),
+                        'op': rule['op'],
+                        'threshold': rule['threshold'],
+                        rule['numerator']: float(numerators[i]),
+                        rule['denominator']: float(volumes[i]),
+                        'as_of_date': as_of_date,
+                        'window_days': window_days,
+                        'source': source,
+                        'evaluated_at': evaluated_at
+                    })
+            # Groups that no longer cross within the window clear, so they can alert again later
+            firing.update(now_firing)
+
+    # Evaluation succeeded: write the new generation's sums, then commit them with the state in one rename
+    superseded = []
+    for grouping, sums in staged.items():
+        sums_file = _sums_file(grouping, generation)
+        sums.to_parquet(os.path.join(state_dir, sums_file), index=False)
+        if grouping in sums_files:
+            superseded.append(sums_files[grouping])
+        sums_files[grouping] = sums_file
+
+    state['firing'] = {name: sorted(groups) for name, groups in firing.items() if groups}
+    state['generation'] = generation
+    state['sums'] = sums_files
+    state['as_of_date'] = as_of_date
+    if source is not None:
+        state['sources'][source] = version
+    write_json_atomic(_state_path(state_dir), state)
+
+    for sums_file in superseded:
+        try:
+            os.remove(os.path.join(state_dir, sums_file))
+        except FileNotFoundError:
+            pass
+    return alerts
+
+def deliver_alerts(alerts, log_path=None, webhook_url=None, timeout=10):
+    """Append alerts to a JSONL log and/or POST them to a webhook as one JSON batch"""
+    if not alerts:
+        return
+    if log_path:
+        with open(log_path, 'a') as f:
+            for alert in alerts:
+                f.write(json.dumps(alert, default=float) + '\n')
+    if webhook_url:
+        request = urllib.request.Request(
+            webhook_url,
+            data=json.dumps({'alerts': alerts}, default=float).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
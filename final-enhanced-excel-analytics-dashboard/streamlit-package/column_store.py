@@ -0,0 +1,241 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from delivery_pipeline import write_json_atomic
+
+# Delivery schema: float64 measures and dictionary-encoded dimensions (int32 codes, -1 for missing)
+STORE_MEASURES = ['requestedcount', 'submittedcount', 'sentcount', 'deliveredcount',
+                  'readcount', 'failedcount', 'pendingcount', 'notsentcount', 'record_count']
+STORE_DIMENSIONS = ['as_of_date', 'accountid', 'wabanumber', 'tmplid', 'tmplname', 'country',
+                    'sourcesystem', 'origintype', 'pricingtype', 'pricingmodel']
+
+MEASURE_DTYPE = np.float64
+CODE_DTYPE = np.int32
+# Largest combined group key aggregate_store builds before re-densifying it
+MAX_KEY_SPACE = 1 << 62
+
+def _manifest_path(store_dir):
+    return os.path.join(store_dir, 'manifest.json')
+
+def _measure_path(store_dir, col):
+    return os.path.join(store_dir, f"{col}.f8")
+
+def _codes_path(store_dir, col):
+    return os.path.join(store_dir, f"{col}.codes.i4")
+
+def _dictionary_path(store_dir, col):
+    return os.path.join(store_dir, f"{col}.dict.json")
+
+def read_manifest(store_dir):
+    """Return the store manifest, or an empty one for a new store"""
+    if not os.path.exists(_manifest_path(store_dir)):
+        return {'rows': 0, 'measures': [], 'integer_measures': [], 'dimensions': [], 'partitions': [], 'sources': {}}
+    with open(_manifest_path(store_dir)) as f:
+        manifest = json.load(f)
+    if isinstance(manifest['sources'], list):
+        # Stores written before sources were keyed by path listed "path@version" strings
+        manifest['sources'] = dict(source.rsplit('@', 1) for source in manifest['sources'])
+    return manifest
+
+def live_rows(manifest):
+    """Rows the store's partitions still count; rows of replaced ingests stay on disk but are never read"""
+    return sum(p['stop'] - p['start'] for p in manifest['partitions'])
+
+def _dictionary_values(series):
+    """Plain Python values for a JSON sidecar dictionary"""
+    return [value.item() if isinstance(value, np.generic) else value for value in series.tolist()]
+
+def ingest_frame(store_dir, df, source=None, version=None):
+    """Append one coerced delivery frame to the store, sorted into per-date partitions
+
+    source identifies where the rows came from (the file path). Ingesting a source again replaces
+    the partitions it contributed before for the dates it covers now, so a re-exported day is never
+    counted twice while a fixed-name export that now holds a new day keeps the earlier days; the
+    same source at the same version is skipped.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    manifest = read_manifest(store_dir)
+    if source is not None and version is not None and manifest['sources'].get(source) == version:
+        return 0
+    if 'record_count' not in df.columns and (not manifest['rows'] or 'record_count' in manifest['measures']):
+        # Raw rows count once each; compacted frames bring their own record_count
+        df = df.assign(record_count=np.ones(len(df), dtype=np.int64))
+
+    # Sort by date so every day of this ingest is one contiguous row range
+    dates = pd.Series(pd.to_datetime(pd.Series(df['as_of_date'].unique(), dtype=object), errors='coerce').to_numpy(),
+                      index=df['as_of_date'].unique())
+    row_dates = dates.reindex(df['as_of_date']).to_numpy()
+    order = np.argsort(row_dates, kind='stable')
+    df = df.iloc[order]
+    row_dates = row_dates[order]
+
+    start_row = manifest['rows']
+    measures = [col for col in STORE_MEASURES if col in df.columns]
+    dimensions = [col for col in STORE_DIMENSIONS if col in df.columns]
+    if manifest['rows'] and (measures != manifest['measures'] or dimensions != manifest['dimensions']):
+        raise ValueError("The frame's columns do not match the store's schema")
+
+    # Drop bytes a failed ingest left past the manifest's row count, so every column appends at the same row
+    for path, itemsize in ([(_measure_path(store_dir, col), np.dtype(MEASURE_DTYPE).itemsize) for col in measures]
+                           + [(_codes_path(store_dir, col), np.dtype(CODE_DTYPE).itemsize) for col in dimensions]):
+        if os.path.exists(path) and os.path.getsize(path) > start_row * itemsize:
+            os.truncate(path, start_row * itemsize)
+
+    for col in dimensions:
+        dictionary_path = _dictionary_path(store_dir, col)
+        known = []
+        if os.path.exists(dictionary_path):
+            with open(dictionary_path) as f:
+                known = json.load(f)
+        # Encode against the distinct values only, then map the local codes onto store codes
+        local_codes, uniques = pd.factorize(df[col])
+        store_codes = pd.Index(known, dtype=object).get_indexer(pd.Index(_dictionary_values(uniques), dtype=object))
+        unseen = np.flatnonzero(store_codes < 0)
+        store_codes[unseen] = len(known) + np.arange(len(unseen))
+        if len(unseen):
+            write_json_atomic(dictionary_path, known + _dictionary_values(uniques[unseen]))
+        codes = np.append(store_codes, -1).astype(CODE_DTYPE)[local_codes]
+        with open(_codes_path(store_dir, col), 'ab') as f:
+            f.write(codes.tobytes())
+
+    for col in measures:
+        with open(_measure_path(store_dir, col), 'ab') as f:
+            f.write(df[col].to_numpy(dtype=MEASURE_DTYPE).tobytes())
+
+    # Date-partition index: one row range per day of this ingest
+    new_partitions = []
+    boundaries = np.flatnonzero(np.r_[True, row_dates[1:] != row_dates[:-1]]) if len(df) else np.array([], dtype=int)
+    for start, stop in zip(boundaries, np.r_[boundaries[1:], len(df)]):
+        day = row_dates[start]
+        new_partitions.append({
+            'date': None if pd.isna(day) else f"{pd.Timestamp(day):%Y-%m-%d}",
+            'start': int(start_row + start),
+            'stop': int(start_row + stop),
+            'source': source
+        })
+
+    # The manifest is written last; readers only map rows it already counts
+    manifest['rows'] = start_row + len(df)
+    # Measures are stored as float64; remember the ones every ingest delivered as integers
+    integer_measures = [col for col in measures if pd.api.types.is_integer_dtype(df[col])]
+    if start_row:
+        integer_measures = [col for col in integer_measures if col in manifest['integer_measures']]
+    manifest['measures'] = measures
+    manifest['integer_measures'] = integer_measures
+    manifest['dimensions'] = dimensions
+    # The source's earlier partitions of these dates drop out of the index in the same manifest write
+    # that adds the new ones
+    replaced = {(source, p['date']) for p in new_partitions} if source is not None else set()
+    manifest['partitions'] = [p for p in manifest['partitions']
+                              if (p.get('source'), p['date']) not in replaced] + new_partitions
+    if source is not None:
+        manifest['sources'][source] = version
+    write_json_atomic(_manifest_path(store_dir), manifest)
+    return len(df)
+
+def open_store(store_dir):
+    """Memory-map every column of the store; nothing is read until it is queried"""
+    manifest = read_manifest(store_dir)
+    rows = manifest['rows']
+    store = {'dir': store_dir, 'manifest': manifest, 'measures': {}, 'codes': {}, 'dictionaries': {}}
+    if not rows:
+        return store
+
+    for col in manifest['measures']:
+        store['measures'][col] = np.memmap(_measure_path(store_dir, col), dtype=MEASURE_DTYPE, mode='r', shape=(rows,))
+    for col in manifest['dimensions']:
+        store['codes'][col] = np.memmap(_codes_path(store_dir, col), dtype=CODE_DTYPE, mode='r', shape=(rows,))
+        with open(_dictionary_path(store_dir, col)) as f:
+            store['dictionaries'][col] = pd.Index(json.load(f))
+    return store
+
+def store_dates(store):
+    """Sorted distinct dates covered by the store's partitions"""
+    return sorted({pd.Timestamp(p['date']).date() for p in store['manifest']['partitions'] if p['date']})
+
+def select_rows(store, date_range=None):
+    """Row selection of the live partitions in a date range: a slice when it is contiguous, else sorted positions"""
+    partitions = store['manifest']['partitions']
+    if date_range is None:
+        ranges = sorted((p['start'], p['stop']) for p in partitions)
+    else:
+        start, end = (f"{pd.Timestamp(day):%Y-%m-%d}" for day in date_range)
+        ranges = sorted((p['start'], p['stop']) for p in partitions
+                        if p['date'] is not None and start <= p['date'] <= end)
+    if not ranges:
+        return slice(0, 0)
+    if all(prev_stop == next_start for (_, prev_stop), (next_start, _) in zip(ranges, ranges[1:])):
+        return slice(ranges[0][0], ranges[-1][1])
+    return np.concatenate([np.arange(first, last) for first, last in ranges])
+
+def decode_dimension(store, col, codes):
+    """Turn dictionary codes back into values (-1 becomes missing)"""
+    values = store['dictionaries'][col]
+    if len(codes) and codes.min() < 0:
+        # Code -1 indexes the last slot, so append the missing value there
+        values = values.append(pd.Index([np.nan]))
+    return values.to_numpy()[codes]
+
+def query_frame(store, columns=None, date_range=None):
+    """Materialize the selected columns and dates as a regular frame for the analyze_* functions"""
+    rows = select_rows(store, date_range)
+    manifest = store['manifest']
+    columns = columns or manifest['dimensions'] + manifest['measures']
+
+    data = {}
+    for col in columns:
+        if col in store['measures']:
+            values = np.asarray(store['measures'][col][rows])
+            data[col] = values.astype(np.int64) if col in manifest['integer_measures'] else values
+        elif col in store['codes']:
+            data[col] = decode_dimension(store, col, np.asarray(store['codes'][col][rows]))
+    return pd.DataFrame(data)
+
+def aggregate_store(store, keys, measures=None, date_range=None, dense_limit=1 << 22):
+    """Sum measures per key combination straight from the codes, keeping missing keys like groupby(dropna=False)"""
+    rows = select_rows(store, date_range)
+    measures = measures or store['manifest']['measures']
+    row_count = len(store['measures'][store['manifest']['measures'][0]][rows])
+
+    # Mixed-radix key over the code columns; code -1 (missing) is shifted to 0
+    combined = np.zeros(row_count, dtype=np.int64)
+    key_space = 1
+    for col in keys:
+        radix = len(store['dictionaries'][col]) + 1
+        if key_space * radix > MAX_KEY_SPACE:
+            # Re-densify before the next column could overflow int64; sorting keeps the key order
+            combined, uniques = pd.factorize(combined, sort=True)
+            combined = combined.astype(np.int64)
+            key_space = max(len(uniques), 1)
+        combined = combined * radix + (np.asarray(store['codes'][col][rows], dtype=np.int64) + 1)
+        key_space *= radix
+
+    if key_space <= dense_limit:
+        # Small key space: bin directly on the combined key, no sort needed
+        bins, bin_count = combined, key_space
+        groups = np.flatnonzero(np.bincount(bins, minlength=bin_count)) if row_count else np.zeros(0, dtype=np.int64)
+        positions = groups
+    else:
+        bins, uniques = pd.factorize(combined, sort=True)
+        bin_count = len(uniques)
+        groups = np.arange(bin_count)
+        positions = slice(None)
+
+    # Decode every key from the first row of its group
+    first_rows = np.zeros(bin_count, dtype=np.int64)
+    first_rows[bins[::-1]] = np.arange(row_count - 1, -1, -1)
+    first_rows = first_rows[groups]
+    result = {col: decode_dimension(store, col, np.asarray(store['codes'][col][rows])[first_rows]) for col in keys}
+    frame = pd.DataFrame({col: result[col] for col in keys}, index=pd.RangeIndex(len(groups)))
+    for col in measures:
+        if col != 'record_count':
+            frame[col] = np.bincount(bins, weights=np.asarray(store['measures'][col][rows]), minlength=bin_count)[positions]
+    if 'record_count' in store['measures']:
+        record_counts = np.bincount(bins, weights=np.asarray(store['measures']['record_count'][rows]), minlength=bin_count)
+        frame['record_count'] = record_counts[positions].astype(np.int64)
+    else:
+        frame['record_count'] = np.bincount(bins, minlength=bin_count)[positions]
+    return frame
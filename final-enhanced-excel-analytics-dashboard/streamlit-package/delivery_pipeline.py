@@ -0,0 +1,261 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Columns no analysis reads; dropped at load time in low-memory mode
+LOW_MEMORY_DROP_COLUMNS = ['wabanumber']
+
+# Delivery count columns every analysis sums; always coerced, whatever else the schema profile finds
+COUNT_COLUMNS = ['requestedcount', 'submittedcount', 'sentcount', 'deliveredcount',
+                 'readcount', 'failedcount', 'pendingcount', 'notsentcount']
+
+# Dimension tuple the analyses group and filter on; compaction pre-sums the counts over it and drops
+# every other column (wabanumber, sourcesystem, ...)
+COMPACTION_KEYS = ['as_of_date', 'accountid', 'tmplid', 'tmplname', 'country', 'origintype', 'pricingtype', 'pricingmodel']
+
+# Grouping sets the dashboard summary views read; materialized summaries and column-store aggregates
+# build exactly these, each also keyed by as_of_date
+SUMMARY_GROUPING_SETS = {
+    'totals': [],
+    'pricing': ['pricingmodel', 'pricingtype'],
+    'country': ['country'],
+    'template_countries': ['accountid', 'tmplid', 'tmplname', 'country']
+}
+
+# Funnel invariants as (smaller, larger) count pairs; a row violates one when smaller > larger
+FUNNEL_INVARIANTS = [
+    ('submittedcount', 'requestedcount'),
+    ('sentcount', 'submittedcount'),
+    ('deliveredcount', 'sentcount'),
+    ('readcount', 'deliveredcount'),
+    ('failedcount', 'submittedcount'),
+    ('pendingcount', 'submittedcount'),
+    ('notsentcount', 'requestedcount')
+]
+
+# Delivery funnel stages in order; each stage converts from the one before it
+FUNNEL_STAGES = ['requestedcount', 'submittedcount', 'sentcount', 'deliveredcount', 'readcount']
+
+def file_version(file_path):
+    """Identity of one version of a file on disk (modification time and size)"""
+    stat = os.stat(file_path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+def write_json_atomic(path, payload):
+    """Replace a JSON file in one rename so readers never see a partial write"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, default=float)
+    os.replace(tmp_path, path)
+
+def read_rss_mb():
+    """Return (current, peak) resident set size of this process in MB; None where unavailable"""
+    current = peak = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    current = int(line.split()[1]) / 1024
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) / 1024
+    except OSError:
+        if resource is not None:
+            # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+    return current, peak
+
+def reset_peak_rss():
+    """Reset the kernel's peak-RSS mark so the next reading covers a single stage (Linux only)
+
+    The mark belongs to the whole process: concurrent sessions reset each other's and add to it.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+@contextmanager
+def profile_stage(trace, stage):
+    """Record wall time, CPU time and RSS of one pipeline stage into the trace (no-op when trace is None)
+
+    RSS readings are process-wide, so they only describe this stage while no other session is working.
+    """
+    if trace is None:
+        yield
+        return
+
+    reset_peak_rss()
+    rss_start, _ = read_rss_mb()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield
+    finally:
+        wall_seconds = time.perf_counter() - wall_start
+        cpu_seconds = time.process_time() - cpu_start
+        rss_end, peak_rss = read_rss_mb()
+        trace.append({
+            'stage': stage,
+            'wall_seconds': wall_seconds,
+            'cpu_seconds': cpu_seconds,
+            'rss_mb': rss_end,
+            'rss_delta_mb': rss_end - rss_start if rss_end is not None and rss_start is not None else None,
+            'peak_rss_mb': peak_rss
+        })
+
+def record_memory_footprint(footprints, name, obj):
+    """Record the deep in-memory size of an intermediate frame, series or export buffer (no-op without footprints)"""
+    if obj is None or footprints is None:
+        return
+    if isinstance(obj, pd.DataFrame):
+        rows, size = len(obj), obj.memory_usage(deep=True).sum()
+    elif isinstance(obj, pd.Series):
+        rows, size = len(obj), obj.memory_usage(deep=True)
+    else:
+        rows, size = None, len(obj)
+    footprints.append({'object': name, 'rows': rows, 'memory_mb': size / 1024 ** 2})
+
+def estimate_load_memory_mb(source, sample_bytes=1 << 20):
+    """Estimate the parsed in-memory size of a CSV file path or upload from its first megabyte"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as f:
+            return estimate_load_memory_mb(f, sample_bytes)
+
+    source.seek(0, 2)
+    file_size = source.tell()
+    source.seek(0)
+
+    if str(getattr(source, 'name', '')).endswith(('.xlsx', '.xls')):
+        # Spreadsheets are compressed; assume a typical expansion factor
+        return file_size * 10 / 1024 ** 2
+
+    head = source.read(sample_bytes)
+    source.seek(0)
+    head = head[:head.rfind(b'\n') + 1] or head
+    sample = pd.read_csv(BytesIO(head))
+    if sample.empty:
+        return file_size / 1024 ** 2
+
+    bytes_per_row = sample.memory_usage(deep=True).sum() / len(sample)
+    estimated_rows = file_size / (len(head) / (len(sample) + 1))
+    return estimated_rows * bytes_per_row / 1024 ** 2
+
+def parse_as_of_dates(series):
+    """Parse as_of_date strings once per distinct value and map the dates back onto the rows"""
+    codes, uniques = pd.factorize(series)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), errors='coerce').to_numpy()
+    # Missing values are coded -1, which picks the trailing NaT
+    return np.append(parsed, np.datetime64('NaT'))[codes]
+
+def coerce_and_validate_counts(df, numeric_columns, low_memory=False, quality_report=None, sample_size=5, chunk_rows=1 << 18):
+    """Coerce count columns to numbers and run every type and funnel check in one fused pass"""
+    columns = [col for col in numeric_columns if col in df.columns]
+    rules, counts, samples = [], [], []
+
+    def record(rule, mask):
+        rules.append(rule)
+        counts.append(int(np.count_nonzero(mask)))
+        samples.append(df.index[np.flatnonzero(mask)[:sample_size]].tolist() if counts[-1] else [])
+
+    arrays = []
+    for col in columns:
+        # Type checks come from the coercion itself: NaN after to_numeric is either missing or unparseable
+        raw_missing = df[col].isna().to_numpy()
+        coerced = pd.to_numeric(df[col], errors='coerce')
+        record(f"{col} is missing", raw_missing)
+        record(f"{col} is not a number", coerced.isna().to_numpy() & ~raw_missing)
+        df[col] = coerced.fillna(0)
+        arrays.append(df[col].to_numpy(dtype=np.float64))
+
+    invariants = [(small, large) for small, large in FUNNEL_INVARIANTS if small in columns and large in columns]
+    value_rules = ([f"{col} < 0" for col in columns] + [f"{col} is not a whole number" for col in columns] +
+                   [f"{small} > {large}" for small, large in invariants])
+    small_idx = [columns.index(small) for small, _ in invariants]
+    large_idx = [columns.index(large) for _, large in invariants]
+    value_counts = np.zeros(len(value_rules), dtype=np.int64)
+    value_samples = [[] for _ in value_rules]
+
+    # One row-chunked pass evaluates every value rule on a (columns x rows) block at once
+    for start in range(0, len(df) if arrays else 0, chunk_rows):
+        block = np.stack([values[start:start + chunk_rows] for values in arrays])
+        violations = np.concatenate([block < 0, block != np.floor(block), block[small_idx] > block[large_idx]])
+        chunk_counts = np.count_nonzero(violations, axis=1)
+        value_counts += chunk_counts
+        for i in np.flatnonzero(chunk_counts):
+            if len(value_samples[i]) < sample_size:
+                positions = np.flatnonzero(violations[i])[:sample_size - len(value_samples[i])] + start
+                value_samples[i].extend(df.index[positions].tolist())
+
+    rules += value_rules
+    counts += value_counts.tolist()
+    samples += value_samples
+
+    if low_memory:
+        for col in columns:
+            # Counts are whole numbers; keep them in the smallest integer type that fits
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+
+    report = [
+        {'rule': rule, 'violations': count, 'sample_rows': sample}
+        for rule, count, sample in zip(rules, counts, samples)
+    ]
+    if quality_report is not None:
+        quality_report.extend(report)
+    return report
+
+def compact_rows(df, measures, compaction_report=None):
+    """Pre-sum the count columns over COMPACTION_KEYS, keeping the raw row count of each compacted row"""
+    keys = [col for col in COMPACTION_KEYS if col in df.columns]
+    measures = [col for col in measures if col in df.columns and col != 'record_count']
+    grouped = df.groupby(keys, dropna=False, sort=False)
+    compacted = grouped[measures].sum()
+    compacted['record_count'] = grouped['record_count'].sum() if 'record_count' in df.columns else grouped.size()
+    compacted = compacted.reset_index()
+
+    if compaction_report is not None:
+        compaction_report.update({
+            'rows_before': len(df),
+            'rows_after': len(compacted),
+            'ratio': len(df) / max(len(compacted), 1),
+            'dropped_columns': [col for col in df.columns if col not in compacted.columns]
+        })
+    return compacted
+
+def reduce_counts(df, columns, keys=None):
+    """Sum count columns per group as one reduction over the (rows x columns) count matrix"""
+    if keys:
+        totals = df.groupby(keys)[columns].sum()
+    else:
+        totals = pd.DataFrame(df[columns].to_numpy(dtype=np.float64).sum(axis=0, keepdims=True), columns=columns)
+    # Integer count columns stay integers
+    return totals.astype({col: np.int64 for col in columns if pd.api.types.is_integer_dtype(df[col])})
+
+def compute_funnel(df, keys=None):
+    """Stage totals, stage-to-stage conversion and share of requested for every group, in one reduction"""
+    stages = [col for col in FUNNEL_STAGES if col in df.columns]
+    totals = reduce_counts(df, stages, keys)
+    matrix = totals.to_numpy(dtype=np.float64)
+
+    # Two broadcast divisions over the (groups x stages) matrix: each stage over the previous one and over requested
+    with np.errstate(divide='ignore', invalid='ignore'):
+        conversion = np.nan_to_num(matrix[:, 1:] / matrix[:, :-1] * 100, nan=0.0, posinf=0.0)
+        share = np.nan_to_num(matrix[:, 1:] / matrix[:, :1] * 100, nan=0.0, posinf=0.0)
+
+    funnel = totals.reset_index() if keys else totals
+    for i, stage in enumerate(stages[1:]):
+        name = stage.replace('count', '')
+        funnel[f"{name}_conversion"] = conversion[:, i]
+        funnel[f"{name}_percentage"] = share[:, i]
+    return funnel
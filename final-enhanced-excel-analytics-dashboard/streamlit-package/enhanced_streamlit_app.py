@@ -1,119 +1,228 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 import numpy as np
-from io import BytesIO
-import base64
-
-# Page configuration
-st.set_page_config(
-    page_title="Enhanced Excel Analytics Dashboard",
-    page_icon="📊",
-    layout="wide",
-    initial_sidebar_state="expanded"
+import json
+import os
+import time
+
+import column_store
+from delivery_pipeline import (
+    COUNT_COLUMNS,
+    FUNNEL_STAGES,
+    LOW_MEMORY_DROP_COLUMNS,
+    SUMMARY_GROUPING_SETS,
+    coerce_and_validate_counts,
+    compact_rows,
+    compute_funnel,
+    estimate_load_memory_mb,
+    parse_as_of_dates,
+    profile_stage,
+    read_rss_mb,
+    record_memory_footprint,
+    reduce_counts
 )
+from name_index import build_name_index, search_names
+from schema_profile import ROLE_MEASURE, columns_with_role, profile_schema
 
-# Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 3rem;
-        font-weight: bold;
-        color: #1f77b4;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .metric-card {
-        background-color: #f0f2f6;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #1f77b4;
-        margin-bottom: 1rem;
-    }
-    .upload-section {
-        background-color: #f8f9fa;
-        padding: 2rem;
-        border-radius: 1rem;
-        border: 2px dashed #dee2e6;
-        text-align: center;
-    }
-    .chart-container {
-        background-color: white;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        margin-bottom: 1rem;
-    }
-    .stButton > button {
-        background-color: #1f77b4;
-        color: white;
-        border-radius: 0.5rem;
-        border: none;
-        padding: 0.5rem 1rem;
-        font-weight: 500;
-    }
-    .stButton > button:hover {
-        background-color: #1565c0;
-    }
-    .filter-section {
-        background-color: #e3f2fd;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin-bottom: 1rem;
-    }
-</style>
-""", unsafe_allow_html=True)
+# Memory guard: switch to low-memory processing when an upload would push RSS past this share of the limit
+MEMORY_LIMIT_MB = float(os.environ.get('DASHBOARD_MEMORY_LIMIT_MB', 0))
+MEMORY_GUARD_FRACTION = float(os.environ.get('DASHBOARD_MEMORY_GUARD_FRACTION', 0.7))
+
+COMPACT_ROWS = os.environ.get('DASHBOARD_COMPACT_ROWS', '0') == '1'
+
+# Daily summaries written by `analyze_test_data_fixed.py --materialize`, opened without an upload
+MATERIALIZED_DIR = os.environ.get('DASHBOARD_MATERIALIZED_DIR', 'materialized')
+
+# Delivery history appended by `analyze_test_data_fixed.py --ingest-store`, memory-mapped without an upload
+COLUMN_STORE_DIR = os.environ.get('DASHBOARD_COLUMN_STORE_DIR', 'column_store')
+
+def should_use_low_memory_mode(estimated_mb):
+    """Check whether loading an upload of this size would cross the configured memory guard"""
+    if MEMORY_LIMIT_MB <= 0:
+        return False
+    current_rss, _ = read_rss_mb()
+    return (current_rss or 0) + estimated_mb > MEMORY_LIMIT_MB * MEMORY_GUARD_FRACTION
+
+def render_quality_panel(quality_report):
+    """Show the data-quality rules that flagged rows, with sample row indexes"""
+    failing = [rule for rule in quality_report if rule['violations']]
+    if failing:
+        st.warning(f"⚠️ {len(failing)} of {len(quality_report)} data-quality checks flagged rows; "
+                   "non-numeric counts were treated as 0")
+    with st.expander("🧪 Data Quality", expanded=False):
+        if not failing:
+            st.success(f"✅ All {len(quality_report)} type and funnel checks passed")
+        else:
+            st.dataframe(pd.DataFrame([
+                {'Rule': rule['rule'], 'Violations': rule['violations'],
+                 'Sample Rows': ', '.join(map(str, rule['sample_rows']))}
+                for rule in failing
+            ]), use_container_width=True)
+
+def render_diagnostics_panel(trace, footprints=None, memory_info=None):
+    """Show the per-stage timings and memory of this rerun in a collapsible panel"""
+    with st.expander("⏱️ Diagnostics", expanded=False):
+        if not trace:
+            st.info("No stages recorded")
+            return
+
+        timings = pd.DataFrame(trace)
+        total_wall = timings['wall_seconds'].sum()
+        timings['wall_ms'] = timings['wall_seconds'] * 1000
+        timings['cpu_ms'] = timings['cpu_seconds'] * 1000
+        timings['share_percentage'] = (timings['wall_seconds'] / total_wall) * 100 if total_wall > 0 else 0
+
+        st.markdown(f"**Instrumented time:** {total_wall * 1000:,.1f} ms across {len(timings)} stages")
+        st.dataframe(
+            timings[['stage', 'wall_ms', 'cpu_ms', 'share_percentage', 'rss_mb', 'rss_delta_mb', 'peak_rss_mb']]
+            .sort_values('wall_ms', ascending=False),
+            use_container_width=True
+        )
+        st.caption("RSS and peak RSS are read for the whole server process, so other active sessions' work "
+                   "shows up in them; they only describe this rerun while it is the only session")
+
+        if memory_info:
+            st.markdown("#### 🧠 Memory")
+            limit = f"{memory_info['limit_mb']:,.0f} MB" if memory_info['limit_mb'] > 0 else "not set"
+            st.markdown(f"""
+            **Estimated upload footprint:** {memory_info['estimated_mb']:,.1f} MB  
+            **Memory limit:** {limit} (guard at {MEMORY_GUARD_FRACTION:.0%})  
+            **Processing mode:** {'Low-memory' if memory_info['low_memory'] else 'Standard'}
+            """)
+        if footprints:
+            st.dataframe(pd.DataFrame(footprints), use_container_width=True)
+
+        st.download_button(
+            label="🧾 Download Trace as JSON",
+            data=json.dumps({
+                'stages': trace,
+                'total_wall_seconds': total_wall,
+                'footprints': footprints or [],
+                'memory': memory_info or {}
+            }, indent=2, default=float),
+            file_name="dashboard_trace.json",
+            mime="application/json"
+        )
 
-def load_and_process_data(uploaded_file):
+def load_and_process_data(uploaded_file, trace=None, low_memory=False, footprints=None, quality_report=None,
+                          compact=False, compaction_report=None):
     """Load and process the uploaded file"""
     try:
-        if uploaded_file.name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file)
-        else:
-            df = pd.read_excel(uploaded_file)
+        with profile_stage(trace, "read_upload"):
+            if uploaded_file.name.endswith('.csv'):
+                if low_memory:
+                    df = pd.read_csv(uploaded_file, usecols=lambda col: col not in LOW_MEMORY_DROP_COLUMNS)
+                else:
+                    df = pd.read_csv(uploaded_file)
+            else:
+                df = pd.read_excel(uploaded_file)
+                if low_memory:
+                    df = df.drop(columns=[col for col in LOW_MEMORY_DROP_COLUMNS if col in df.columns])
+        if footprints is not None:
+            record_memory_footprint(footprints, "raw", df)
         
-        # Convert numeric columns to proper types
-        numeric_columns = ['requestedcount', 'submittedcount', 'sentcount', 'deliveredcount', 
-                          'readcount', 'failedcount', 'notsentcount']
+        # Convert the delivery counts, plus any other columns the schema profile calls measures, to proper types
+        with profile_stage(trace, "schema_profile"):
+            numeric_columns = COUNT_COLUMNS + [col for col in columns_with_role(profile_schema(df), ROLE_MEASURE)
+                                               if col not in COUNT_COLUMNS]
         
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+        with profile_stage(trace, "numeric_coercion"):
+            coerce_and_validate_counts(df, numeric_columns, low_memory, quality_report)
+        if footprints is not None:
+            record_memory_footprint(footprints, "coerced", df)
+
+        if compact:
+            with profile_stage(trace, "compact_rows"):
+                df = compact_rows(df, numeric_columns, compaction_report)
+            if footprints is not None:
+                record_memory_footprint(footprints, "compacted", df)
         
         return df
     except Exception as e:
         st.error(f"Error loading file: {str(e)}")
         return None
 
+FILTER_COLUMNS = {
+    'origintype': "Origin Type",
+    'country': "Country",
+    'pricingmodel': "Pricing Model",
+    'pricingtype': "Pricing Type",
+    'sourcesystem': "Source System",
+    'accountid': "Account ID"
+}
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_filter_indexes(df):
+    """Build per-value row-ID indexes for every filter column once per dataset"""
+    indexes = {}
+    for col in list(FILTER_COLUMNS) + ['as_of_date']:
+        if col in df.columns:
+            # value -> sorted array of row positions holding that value
+            indexes[col] = df.groupby(col).indices
+
+    # Dates arrive as strings like "July 25, 2025"; parse each distinct value once
+    if 'as_of_date' in indexes:
+        date_values = list(indexes['as_of_date'])
+        parsed = pd.to_datetime(pd.Series(date_values, dtype=object), errors='coerce')
+        indexes['as_of_date_parsed'] = {
+            value: ts.date() for value, ts in zip(date_values, parsed) if not pd.isna(ts)
+        }
+
+    return indexes
+
+def resolve_filter_rows(indexes, selections, date_range=None):
+    """Resolve a filter combination to row positions by index intersection (None means no filter)"""
+    selections = {col: values for col, values in selections.items() if values}
+
+    if date_range is not None and 'as_of_date_parsed' in indexes:
+        start, end = date_range
+        selections['as_of_date'] = [
+            value for value, day in indexes['as_of_date_parsed'].items() if start <= day <= end
+        ]
+
+    if not selections:
+        return None
+
+    matches = []
+    for col, values in selections.items():
+        postings = [indexes[col][value] for value in values if value in indexes[col]]
+        if not postings:
+            return np.array([], dtype=np.intp)
+        # Posting lists of one column are disjoint, so their union is a concatenation
+        matches.append(np.sort(np.concatenate(postings)))
+
+    # Intersect smallest first so every step is bounded by the most selective filter
+    matches.sort(key=len)
+    rows = matches[0]
+    for other in matches[1:]:
+        rows = np.intersect1d(rows, other, assume_unique=True)
+    return rows
+
+# Metric key -> (count column, key of its share of requestedcount)
+DELIVERY_METRICS = {
+    'total_requests': ('requestedcount', None),
+    'total_sent': ('sentcount', 'sent_percentage'),
+    'total_delivered': ('deliveredcount', 'delivered_percentage'),
+    'total_submitted': ('submittedcount', 'submitted_percentage'),
+    'total_failed': ('failedcount', 'failed_percentage'),
+    'total_pending': ('pendingcount', 'pending_percentage'),
+    'total_not_sent': ('notsentcount', 'not_sent_percentage')
+}
+
+FUNNEL_DIMENSIONS = {'pricingmodel': "Pricing Model", 'country': "Country", 'accountid': "Account"}
+
 def calculate_delivery_metrics(df):
     """Calculate delivery metrics for the data"""
-    metrics = {}
-    
-    # Basic counts
-    metrics['total_requests'] = df['requestedcount'].sum()
-    metrics['total_sent'] = df['sentcount'].sum()
-    metrics['total_delivered'] = df['deliveredcount'].sum()
-    metrics['total_submitted'] = df['submittedcount'].sum()
-    metrics['total_failed'] = df['failedcount'].sum()
-    metrics['total_pending'] = df['pendingcount'].sum()
-    metrics['total_not_sent'] = df['notsentcount'].sum()
-    
-    # Calculate percentages
-    if metrics['total_requests'] > 0:
-        metrics['sent_percentage'] = (metrics['total_sent'] / metrics['total_requests']) * 100
-        metrics['delivered_percentage'] = (metrics['total_delivered'] / metrics['total_requests']) * 100
-        metrics['submitted_percentage'] = (metrics['total_submitted'] / metrics['total_requests']) * 100
-        metrics['failed_percentage'] = (metrics['total_failed'] / metrics['total_requests']) * 100
-        metrics['pending_percentage'] = (metrics['total_pending'] / metrics['total_requests']) * 100
-        metrics['not_sent_percentage'] = (metrics['total_not_sent'] / metrics['total_requests']) * 100
-    else:
-        metrics['sent_percentage'] = 0
-        metrics['delivered_percentage'] = 0
-        metrics['submitted_percentage'] = 0
-        metrics['failed_percentage'] = 0
-        metrics['pending_percentage'] = 0
-        metrics['not_sent_percentage'] = 0
+    totals = reduce_counts(df, [column for column, _ in DELIVERY_METRICS.values()])
+    metrics = {key: totals[column].iloc[0] for key, (column, _) in DELIVERY_METRICS.items()}
+
+    # Every share of requestedcount in one vectorized division
+    row = totals.to_numpy(dtype=np.float64)[0]
+    requested = metrics['total_requests']
+    shares = row / requested * 100 if requested > 0 else np.zeros(len(row))
+    for (_, share_key), share in zip(DELIVERY_METRICS.values(), shares):
+        if share_key:
+            metrics[share_key] = share
     
     return metrics
 
@@ -203,7 +312,708 @@ def analyze_pricing_delivery_table(df):
     
     return pricing_delivery.sort_values('delivery_rate', ascending=False)
 
+def _index_key(value):
+    """Slice-index form of a key value; every missing value becomes None so it can be looked up"""
+    return None if pd.isna(value) else value
+
+def _build_slice_index(frame, key_columns):
+    """Map each parent key to the (start, stop) row slice of its children in a key-sorted frame"""
+    if frame.empty:
+        return {}
+
+    # Rows are sorted by the key columns, so each parent's children are contiguous
+    boundary = np.zeros(len(frame), dtype=bool)
+    boundary[0] = True
+    for col in key_columns:
+        values = frame[col].to_numpy()
+        missing = pd.isna(values)
+        # Missing keys sort last and form one group, though NaN != NaN
+        boundary[1:] |= (values[1:] != values[:-1]) & ~(missing[1:] & missing[:-1])
+
+    starts = np.flatnonzero(boundary)
+    stops = np.append(starts[1:], len(frame))
+
+    if len(key_columns) == 1:
+        keys = [_index_key(value) for value in frame[key_columns[0]].to_numpy()[starts].tolist()]
+    else:
+        keys = list(zip(*([_index_key(value) for value in frame[col].to_numpy()[starts].tolist()]
+                          for col in key_columns)))
+
+    return dict(zip(keys, zip(starts.tolist(), stops.tolist())))
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_hierarchical_rollups(df):
+    """Precompute account → template → country rollups with parent-key lookup indexes (shared, read-only)"""
+    hierarchy = ['accountid', 'tmplid', 'tmplname', 'country']
+    if any(col not in df.columns for col in hierarchy):
+        return None
+
+    measures = ['requestedcount', 'deliveredcount', 'failedcount']
+
+    # One pass over the raw rows; the upper levels roll up from the (much smaller) leaf level.
+    # Missing template or country keys stay as groups so every level adds up to the account totals
+    countries = df.groupby(hierarchy, dropna=False)[measures].sum().reset_index()
+    templates = countries.groupby(hierarchy[:3], dropna=False)[measures].sum().reset_index()
+    accounts = templates.groupby('accountid', dropna=False).agg(
+        failedcount=('failedcount', 'sum'),
+        requestedcount=('requestedcount', 'sum'),
+        deliveredcount=('deliveredcount', 'sum'),
+        tmplid=('tmplid', 'nunique')
+    ).reset_index()
+
+    for level in (countries, templates, accounts):
+        level['failure_rate'] = (level['failedcount'] / level['requestedcount']) * 100
+        level['delivery_rate'] = (level['deliveredcount'] / level['requestedcount']) * 100
+
+    return {
+        'accounts': accounts.sort_values('failure_rate', ascending=False).reset_index(drop=True),
+        'templates': templates,
+        'countries': countries,
+        'template_index': _build_slice_index(templates, ['accountid']),
+        'country_index': _build_slice_index(countries, ['accountid', 'tmplid'])
+    }
+
+def get_account_templates(rollups, accountid):
+    """Return the template rollup rows for one account"""
+    start, stop = rollups['template_index'].get(_index_key(accountid), (0, 0))
+    return rollups['templates'].iloc[start:stop].sort_values('failure_rate', ascending=False)
+
+def get_template_countries(rollups, accountid, tmplid):
+    """Return the country rollup rows for one account's template"""
+    start, stop = rollups['country_index'].get((_index_key(accountid), _index_key(tmplid)), (0, 0))
+    return rollups['countries'].iloc[start:stop].sort_values('failure_rate', ascending=False)
+
+TEMPLATE_SEARCH_MEASURES = ['requestedcount', 'sentcount', 'deliveredcount', 'readcount', 'failedcount']
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def build_template_search_index(df):
+    """Aggregate every template once and index its distinct names for substring and prefix search (shared, read-only)"""
+    if 'tmplname' not in df.columns:
+        return None
+
+    keys = [col for col in ['tmplname', 'tmplid'] if col in df.columns]
+    measures = [col for col in TEMPLATE_SEARCH_MEASURES if col in df.columns]
+    grouped = df[df['tmplname'].notna()].groupby(keys, dropna=False, sort=False)
+    templates = grouped[measures].sum()
+    # Grouping sets already count their raw rows; raw frames count themselves
+    templates['rows'] = grouped['record_count'].sum() if 'record_count' in df.columns else grouped.size()
+    for col, label in [('accountid', 'accounts'), ('country', 'countries')]:
+        if col in df.columns:
+            templates[label] = grouped[col].nunique()
+    templates = templates.reset_index()
+
+    index = build_name_index(templates['tmplname'])
+    # Templates sorted by name position: every name's templates are one contiguous slice
+    templates['name_position'] = index['names'].get_indexer(templates['tmplname'].astype(str))
+    templates = templates.sort_values('name_position', kind='stable').reset_index(drop=True)
+    index['template_offsets'] = np.searchsorted(templates['name_position'].to_numpy(), np.arange(len(index['names']) + 1))
+    return index, templates.drop(columns='name_position')
+
+def search_templates(search_index, query, mode='contains'):
+    """Templates whose name matches a query, with their aggregates, busiest first"""
+    index, templates = search_index
+    matches = search_names(index, query, mode)
+
+    # Expand each matched name into its slice of template rows
+    starts = index['template_offsets'][matches]
+    lengths = index['template_offsets'][matches + 1] - starts
+    rows = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+
+    results = templates.iloc[rows].copy()
+    if 'requestedcount' in results.columns:
+        for col, rate in [('deliveredcount', 'delivery_rate'), ('failedcount', 'failure_rate')]:
+            if col in results.columns:
+                results[rate] = (results[col] / results['requestedcount']) * 100
+        results = results.sort_values('requestedcount', ascending=False)
+    return results.reset_index(drop=True)
+
+def render_template_search(search_index, trace, key):
+    """Search box over every template name with the matching templates' aggregates"""
+    st.markdown("## 🔍 Template Search")
+    if search_index is None:
+        st.info("No template names available")
+        return
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        query = st.text_input(
+            "Template name:",
+            key=f"{key}_query",
+            placeholder="e.g. otp_traffic",
+            help="Case-insensitive; searches every template name across all accounts"
+        )
+    with col2:
+        mode = st.radio("Match:", ["Contains", "Starts with"], horizontal=True, key=f"{key}_mode")
+    if not query.strip():
+        st.caption(f"{len(search_index[0]['names']):,} distinct template names indexed")
+        return
+
+    start = time.perf_counter()
+    with profile_stage(trace, "search_templates"):
+        results = search_templates(search_index, query, 'prefix' if mode == "Starts with" else 'contains')
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    st.caption(f"{len(results):,} templates match '{query.strip()}' among "
+               f"{len(search_index[0]['names']):,} distinct names ({elapsed_ms:,.1f} ms)")
+    if not results.empty:
+        render_paginated_table(results, key=f"{key}_table")
+    else:
+        st.info("No template names match the search")
+
+def render_funnel_section(overall, trace, key, dimension_frames=None, top_n=5):
+    """Funnel chart and stage-to-stage conversion for the whole selection or per pricing model, country or account"""
+    import plotly.express as px
+
+    st.markdown("## 🔻 Funnel Conversion")
+    dimension_frames = dimension_frames or {dim: overall for dim in FUNNEL_DIMENSIONS if dim in overall.columns}
+    options = ['overall'] + [dim for dim in FUNNEL_DIMENSIONS if dim in dimension_frames]
+    col1, col2 = st.columns(2)
+    with col1:
+        dimension = st.selectbox("Funnel by:", options, key=f"{key}_dimension",
+                                 format_func=lambda dim: FUNNEL_DIMENSIONS.get(dim, "Overall"))
+    keys = None if dimension == 'overall' else [dimension]
+    with col2:
+        shown = st.slider("Groups charted:", 1, 10, top_n, key=f"{key}_top_n", disabled=keys is None)
+
+    with profile_stage(trace, "compute_funnel"):
+        funnel = compute_funnel(overall if keys is None else dimension_frames[dimension], keys)
+    stages = [col for col in FUNNEL_STAGES if col in funnel.columns]
+    if funnel.empty or len(stages) < 2:
+        st.info("No funnel data available")
+        return
+
+    charted = funnel if keys is None else funnel.nlargest(shown, 'requestedcount')
+    long = charted.melt(id_vars=keys or [], value_vars=stages, var_name='stage', value_name='count')
+    long['stage'] = long['stage'].str.replace('count', '').str.title()
+    with profile_stage(trace, "chart_funnel"):
+        fig_funnel = px.funnel(
+            long,
+            x='count',
+            y='stage',
+            color=long[dimension].astype(str) if keys else None,
+            title="Delivery Funnel" if keys is None else f"Delivery Funnel by {FUNNEL_DIMENSIONS[dimension]} (top {shown} by requests)"
+        )
+    st.plotly_chart(fig_funnel, use_container_width=True)
+
+    if keys is None:
+        steps = pd.DataFrame({
+            'stage': [stage.replace('count', '').title() for stage in stages],
+            'count': funnel[stages].iloc[0].to_numpy(),
+            'conversion_from_previous': [np.nan] + [funnel[f"{stage.replace('count', '')}_conversion"].iloc[0] for stage in stages[1:]],
+            'share_of_requested': [100.0] + [funnel[f"{stage.replace('count', '')}_percentage"].iloc[0] for stage in stages[1:]]
+        })
+        st.dataframe(steps, use_container_width=True)
+    else:
+        render_paginated_table(funnel.sort_values('requestedcount', ascending=False), key=f"{key}_table")
+
+TREND_RATES = {
+    'delivery_rate': 'deliveredcount',
+    'failure_rate': 'failedcount',
+    'pending_rate': 'pendingcount'
+}
+
+@st.cache_data(show_spinner=False)
+def build_daily_buckets(df, dimension):
+    """Pre-aggregate counts into one row per day and dimension value"""
+    measures = ['requestedcount'] + [m for m in TREND_RATES.values() if m in df.columns]
+    dates = pd.Series(parse_as_of_dates(df['as_of_date']), index=df.index, name='date')
+    return df.groupby([dates, df[dimension]])[measures].sum()
+
+def compute_rolling_trends(daily, dimension, granularity='Daily', window=7, top_n=10):
+    """Turn daily buckets into rolling delivery/failure/pending rates for the top dimension values"""
+    if daily.empty:
+        return pd.DataFrame()
+
+    top_values = daily.groupby(level=dimension)['requestedcount'].sum().nlargest(top_n).index
+    daily = daily[daily.index.get_level_values(dimension).isin(top_values)]
+
+    # One column per (measure, dimension value) on a gap-free calendar
+    wide = daily.unstack(level=dimension, fill_value=0).asfreq('D', fill_value=0)
+    if granularity == 'Weekly':
+        wide = wide.resample('W').sum()
+
+    # Rolling sums of numerators and denominators, so rates are volume-weighted
+    rolled = wide.rolling(window, min_periods=1).sum()
+    requested = rolled['requestedcount'].replace(0, np.nan)
+
+    trends = []
+    for value in requested.columns:
+        trend = pd.DataFrame({'date': rolled.index, dimension: value})
+        for rate, measure in TREND_RATES.items():
+            if measure in rolled.columns.get_level_values(0):
+                trend[rate] = (rolled[measure][value] / requested[value] * 100).to_numpy()
+        trends.append(trend)
+
+    return pd.concat(trends, ignore_index=True)
+
+COMPARISON_DIMENSIONS = {
+    'country': ("Country", ['country']),
+    'pricingmodel': ("Pricing Model", ['pricingmodel']),
+    'accountid': ("Account", ['accountid']),
+    'template': ("Template", ['tmplid', 'tmplname'])
+}
+
+@st.cache_data(show_spinner=False)
+def build_daily_dimension_aggregates(df):
+    """Pre-aggregate requested/delivered/failed counts per day for every comparison dimension"""
+    measures = ['requestedcount', 'deliveredcount', 'failedcount']
+    dates = pd.Series(parse_as_of_dates(df['as_of_date']), index=df.index, name='date')
+    aggregates = {}
+    for name, (_, keys) in COMPARISON_DIMENSIONS.items():
+        if all(col in df.columns for col in keys):
+            aggregates[name] = df.groupby([dates] + [df[col] for col in keys])[measures].sum()
+    return aggregates
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_baseline_file(file_id, _uploaded_file, compact):
+    """Load a comparison baseline upload and its filter indexes once per file (keyed by the upload's file id)"""
+    baseline_df = load_and_process_data(_uploaded_file, compact=compact)
+    if baseline_df is None:
+        return None, None
+    return baseline_df, build_filter_indexes(baseline_df)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def build_baseline_aggregates(file_id, compact, selection_key, _baseline_df, _filter_indexes):
+    """Daily comparison aggregates of the baseline rows that match the current dimension filters"""
+    # Only the dimension filters carry over; the baseline is another day, so the date range does not
+    rows = resolve_filter_rows(_filter_indexes, {col: list(values) for col, values in selection_key
+                                                 if col in _filter_indexes})
+    return build_daily_dimension_aggregates(_baseline_df if rows is None else _baseline_df.iloc[rows])
+
+def sum_aggregate_range(daily, date_range=None):
+    """Collapse daily aggregates to one row per dimension value, optionally within a date range"""
+    if date_range is not None:
+        dates = daily.index.get_level_values('date')
+        daily = daily[(dates >= pd.Timestamp(date_range[0])) & (dates <= pd.Timestamp(date_range[1]))]
+    return daily.groupby(level=list(daily.index.names[1:])).sum()
+
+def compare_aggregates(base, current):
+    """Align two sides' aggregates and rank the delivery and failure rate changes by impact"""
+    joined = base.join(current, how='outer', lsuffix='_base', rsuffix='_current')
+    joined['status'] = np.select(
+        [joined['requestedcount_base'].isna(), joined['requestedcount_current'].isna()], ['new', 'gone'], 'both'
+    )
+    joined = joined.fillna(0)
+
+    for rate, measure in [('delivery_rate', 'deliveredcount'), ('failure_rate', 'failedcount')]:
+        base_total = base['requestedcount'].sum()
+        overall_base = base[measure].sum() / base_total * 100 if base_total else 0
+        # Values new on the current side are measured against the overall baseline rate
+        base_rate = (joined[f'{measure}_base'] / joined['requestedcount_base'].replace(0, np.nan) * 100).fillna(overall_base)
+        current_rate = joined[f'{measure}_current'] / joined['requestedcount_current'].replace(0, np.nan) * 100
+        joined[f'{rate}_base'] = base_rate
+        joined[f'{rate}_current'] = current_rate
+        joined[f'{rate}_delta'] = current_rate - base_rate
+        # Impact: messages the rate change moved at the current volume
+        joined[f'{rate}_impact'] = (joined[f'{rate}_delta'] * joined['requestedcount_current'] / 100).fillna(0)
+
+    joined['impact'] = joined[['delivery_rate_impact', 'failure_rate_impact']].abs().max(axis=1)
+    return joined.reset_index().sort_values('impact', ascending=False, kind='stable').reset_index(drop=True)
+
+def _sorted_positions(frame, sort_column, ascending):
+    """Row positions of the frame ordered by one column"""
+    column = frame[sort_column].reset_index(drop=True)
+    return column.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+
+def _search_mask(frame, query):
+    """Boolean mask of rows where any text or integer column contains the query"""
+    mask = np.zeros(len(frame), dtype=bool)
+    for col in frame.select_dtypes(exclude=['floating', 'bool', 'datetime']).columns:
+        mask |= frame[col].astype(str).str.contains(query, case=False, regex=False, na=False).to_numpy()
+    return mask
+
+def _table_positions(frame, key, data_key, sort_column, ascending, query):
+    """Sorted, searched row positions of one table, kept in session state for its current data only
+
+    data_key identifies the data behind the frame (upload, filters); without it nothing is kept
+    between reruns. Each table holds at most one order and one search mask, for this session.
+    """
+    token = (data_key, len(frame), tuple(frame.columns))
+    cached = st.session_state.get(f"{key}_positions")
+    if data_key is None or cached is None or cached['token'] != token:
+        cached = {'token': token, 'sort': None, 'positions': None, 'query': None, 'mask': None}
+    if cached['sort'] != (sort_column, ascending):
+        cached.update(sort=(sort_column, ascending), positions=_sorted_positions(frame, sort_column, ascending))
+    positions = cached['positions']
+    if query:
+        if cached['query'] != query:
+            cached.update(query=query, mask=_search_mask(frame, query))
+        positions = positions[cached['mask'][positions]]
+    if data_key is not None:
+        st.session_state[f"{key}_positions"] = cached
+    return positions
+
+def render_paginated_table(frame, key, page_size=25, data_key=None):
+    """Render a sortable, searchable table that only sends the visible page to the browser"""
+    if frame.empty:
+        st.info("No rows to display")
+        return
+
+    col1, col2, col3 = st.columns([2, 2, 1])
+    with col1:
+        query = st.text_input("Search:", key=f"{key}_search").strip()
+    with col2:
+        sort_column = st.selectbox("Sort by:", list(frame.columns), key=f"{key}_sort")
+    with col3:
+        descending = st.checkbox("Descending", value=True, key=f"{key}_desc")
+
+    positions = _table_positions(frame, key, data_key, sort_column, not descending, query)
+
+    total_pages = max(1, -(-len(positions) // page_size))
+    page = st.number_input(
+        f"Page (of {total_pages:,}):", min_value=1, max_value=total_pages, value=1, step=1, key=f"{key}_page"
+    )
+
+    start = (int(page) - 1) * page_size
+    page_positions = positions[start:start + page_size]
+    st.dataframe(frame.iloc[page_positions], use_container_width=True)
+    st.caption(f"Showing rows {min(start + 1, len(positions)):,}–{start + len(page_positions):,} of {len(positions):,}")
+
+def render_metric_cards(metrics):
+    """Render the overall delivery metric cards"""
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>Total Requests</h3>
+            <h2>{metrics['total_requests']:,.0f}</h2>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col2:
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>Sent</h3>
+            <h2>{metrics['total_sent']:,.0f}</h2>
+            <p>{metrics['sent_percentage']:.1f}%</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col3:
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>Delivered</h3>
+            <h2>{metrics['total_delivered']:,.0f}</h2>
+            <p>{metrics['delivered_percentage']:.1f}%</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col4:
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>Submitted</h3>
+            <h2>{metrics['total_submitted']:,.0f}</h2>
+            <p>{metrics['submitted_percentage']:.1f}%</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    # Additional Metrics
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>Failed</h3>
+            <h2>{metrics['total_failed']:,.0f}</h2>
+            <p>{metrics['failed_percentage']:.1f}%</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col2:
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>Pending</h3>
+            <h2>{metrics['total_pending']:,.0f}</h2>
+            <p>{metrics['pending_percentage']:.1f}%</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+    with col3:
+        st.markdown(f"""
+        <div class="metric-card">
+            <h3>Not Sent</h3>
+            <h2>{metrics['total_not_sent']:,.0f}</h2>
+            <p>{metrics['not_sent_percentage']:.1f}%</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+def list_materialized_summaries(directory):
+    """Read the manifest of every materialized daily summary in a directory"""
+    summaries = []
+    if not os.path.isdir(directory):
+        return summaries
+
+    for name in sorted(os.listdir(directory)):
+        manifest_path = os.path.join(directory, name, 'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            manifest['path'] = os.path.join(directory, name)
+            manifest['version'] = os.stat(manifest_path).st_mtime_ns
+            summaries.append(manifest)
+    return summaries
+
+@st.cache_data(show_spinner=False)
+def load_materialized_summaries(summary_paths, versions):
+    """Concatenate each grouping set across daily summaries (versions only key the cache)"""
+    grouping_sets = {}
+    for path in summary_paths:
+        for file_name in sorted(os.listdir(path)):
+            if file_name.endswith('.parquet'):
+                name = file_name[:-len('.parquet')]
+                grouping_sets.setdefault(name, []).append(pd.read_parquet(os.path.join(path, file_name)))
+    return {name: pd.concat(frames, ignore_index=True) for name, frames in grouping_sets.items()}
+
+def render_materialized_view(summaries, trace, footprints):
+    """Render the dashboard from materialized daily summaries instead of raw rows"""
+    st.markdown("## 🗄️ Materialized Daily Summaries")
+
+    days = sorted({pd.Timestamp(day).date() for summary in summaries for day in summary['dates']})
+    if not days:
+        st.info("The materialized summaries contain no parseable as_of_date values")
+        return
+    picked_dates = st.date_input(
+        "Review Date Range:",
+        value=(days[0], days[-1]),
+        min_value=days[0],
+        max_value=days[-1],
+        key="materialized_dates"
+    )
+    start, end = tuple(picked_dates) if isinstance(picked_dates, (list, tuple)) and len(picked_dates) == 2 else (days[0], days[-1])
+
+    selected = [
+        summary for summary in summaries
+        if any(start <= pd.Timestamp(day).date() <= end for day in summary['dates'])
+    ]
+    if not selected:
+        st.info("No materialized summaries cover the selected dates")
+        return
+
+    with profile_stage(trace, "load_materialized_summaries"):
+        grouping_sets = load_materialized_summaries(
+            tuple(summary['path'] for summary in selected),
+            tuple(summary['version'] for summary in selected)
+        )
+        # A daily file may hold several as_of_dates; keep only the picked ones
+        for name, frame in grouping_sets.items():
+            dates = parse_as_of_dates(frame['as_of_date'])
+            grouping_sets[name] = frame[(dates >= np.datetime64(start)) & (dates <= np.datetime64(end))]
+            record_memory_footprint(footprints, f"materialized_{name}", grouping_sets[name])
+
+    st.success(f"✅ Loaded {len(selected):,} daily summaries covering {sum(summary['rows'] for summary in selected):,} raw rows")
+    st.caption("Dimension filters, the drill-down and record exports need the raw file; upload it above for those")
+
+    render_summary_views(grouping_sets, trace, footprints, key_prefix="materialized")
+    render_diagnostics_panel(trace, footprints)
+
+def render_summary_views(grouping_sets, trace, footprints, key_prefix):
+    """Render the dashboard sections from grouping sets of raw count sums"""
+    import plotly.express as px
+
+    # Every grouping set holds raw count sums, so the regular analyses aggregate it further unchanged
+    empty = pd.DataFrame()
+
+    st.markdown("## 📈 Overall Delivery Metrics")
+    with profile_stage(trace, "calculate_delivery_metrics"):
+        metrics = calculate_delivery_metrics(grouping_sets['totals'])
+    render_metric_cards(metrics)
+
+    dimension_sources = {'pricingmodel': 'pricing', 'country': 'country', 'accountid': 'template_countries'}
+    render_funnel_section(grouping_sets['totals'], trace, key=f"{key_prefix}_funnel",
+                          dimension_frames={dim: grouping_sets[name] for dim, name in dimension_sources.items()
+                                            if name in grouping_sets})
+
+    st.markdown("## 💰 Pricing Model Analysis")
+    with profile_stage(trace, "analyze_pricing_model_metrics"):
+        pricing_analysis = analyze_pricing_model_metrics(grouping_sets.get('pricing', empty))
+    if not pricing_analysis.empty:
+        st.dataframe(pricing_analysis, use_container_width=True)
+        fig_pricing = px.bar(
+            pricing_analysis,
+            x='pricingmodel',
+            y=['sentcount', 'deliveredcount', 'submittedcount'],
+            title="Pricing Model Performance",
+            barmode='group'
+        )
+        st.plotly_chart(fig_pricing, use_container_width=True)
+    else:
+        st.info("No pricing model data available")
+
+    st.markdown("## 🌍 Country-wise Analysis")
+    with profile_stage(trace, "analyze_country_metrics"):
+        country_analysis = analyze_country_metrics(grouping_sets.get('country', empty))
+    if not country_analysis.empty:
+        render_paginated_table(country_analysis, key=f"{key_prefix}_country_table", page_size=15)
+    else:
+        st.info("No country data available")
+
+    st.markdown("## ❌ Account Failure Analysis")
+    with profile_stage(trace, "analyze_account_failures"):
+        account_failures = analyze_account_failures(grouping_sets.get('template_countries', empty))
+    if not account_failures.empty:
+        render_paginated_table(account_failures, key=f"{key_prefix}_account_table", page_size=10)
+    else:
+        st.info("No account ID data available")
+
+    st.markdown("## 📧 Template Failure Analysis")
+    with profile_stage(trace, "analyze_template_failures"):
+        template_failures = analyze_template_failures(grouping_sets.get('template_countries', empty))
+    if not template_failures.empty:
+        render_paginated_table(template_failures, key=f"{key_prefix}_template_table")
+    else:
+        st.info("No template data available")
+
+    if 'template_countries' in grouping_sets:
+        with profile_stage(trace, "build_template_search_index"):
+            template_search_index = build_template_search_index(grouping_sets['template_countries'])
+        render_template_search(template_search_index, trace, key=f"{key_prefix}_template_search")
+
+    st.markdown("## 📊 Pricing Model Delivery Table")
+    with profile_stage(trace, "analyze_pricing_delivery_table"):
+        pricing_delivery = analyze_pricing_delivery_table(grouping_sets.get('pricing', empty))
+    if not pricing_delivery.empty:
+        st.dataframe(pricing_delivery, use_container_width=True)
+    else:
+        st.info("No pricing model data available")
+
+    st.markdown("## 📅 Delivery Trends")
+    trend_dimensions = [dim for dim, name in dimension_sources.items() if name in grouping_sets]
+    if trend_dimensions:
+        col1, col2 = st.columns(2)
+        with col1:
+            trend_dimension = st.selectbox("Trend by:", trend_dimensions, key=f"{key_prefix}_trend_dimension")
+        with col2:
+            window = st.slider("Rolling window (days):", min_value=1, max_value=30, value=7, key=f"{key_prefix}_trend_window")
+
+        with profile_stage(trace, "build_trends"):
+            daily = build_daily_buckets(grouping_sets[dimension_sources[trend_dimension]], trend_dimension)
+            trends = compute_rolling_trends(daily, trend_dimension, 'Daily', window, top_n=5)
+        if not trends.empty:
+            fig_trend = px.line(
+                trends,
+                x='date',
+                y='delivery_rate',
+                color=trends[trend_dimension].astype(str),
+                markers=True,
+                title=f"Daily Delivery Rate by {trend_dimension} ({window}-day rolling)"
+            )
+            st.plotly_chart(fig_trend, use_container_width=True)
+
+@st.cache_data(show_spinner=False)
+def aggregate_column_store(store_dir, version, start, end):
+    """Build the summary grouping sets for a date range straight from the store's codes (version only keys the cache)"""
+    store = column_store.open_store(store_dir)
+    grouping_sets = {}
+    for name, keys in SUMMARY_GROUPING_SETS.items():
+        keys = ['as_of_date'] + keys
+        if all(col in store['codes'] for col in keys):
+            grouping_sets[name] = column_store.aggregate_store(store, keys, date_range=(start, end))
+    return grouping_sets
+
+def render_column_store_view(store_dir, trace, footprints):
+    """Render the dashboard from the memory-mapped column store instead of an upload"""
+    st.markdown("## 🗃️ Delivery History")
+
+    with profile_stage(trace, "open_column_store"):
+        store = column_store.open_store(store_dir)
+    days = column_store.store_dates(store)
+    if not days:
+        st.info("The column store contains no parseable as_of_date values")
+        return
+    picked_dates = st.date_input(
+        "Review Date Range:",
+        value=(days[0], days[-1]),
+        min_value=days[0],
+        max_value=days[-1],
+        key="store_dates"
+    )
+    start, end = tuple(picked_dates) if isinstance(picked_dates, (list, tuple)) and len(picked_dates) == 2 else (days[0], days[-1])
+
+    with profile_stage(trace, "aggregate_column_store"):
+        version = os.stat(os.path.join(store_dir, 'manifest.json')).st_mtime_ns
+        grouping_sets = aggregate_column_store(store_dir, version, start, end)
+        for name, frame in grouping_sets.items():
+            record_memory_footprint(footprints, f"store_{name}", frame)
+    selected_rows = int(grouping_sets['totals']['record_count'].sum()) if 'totals' in grouping_sets else 0
+    if not selected_rows:
+        st.info("The column store holds no rows in the selected dates")
+        return
+
+    st.success(f"✅ Mapped {column_store.live_rows(store['manifest']):,} rows over {len(days):,} days; "
+               f"{selected_rows:,} rows in the selected dates")
+    st.caption("Dimension filters, the drill-down and record exports need the raw file; upload it above for those")
+    render_summary_views(grouping_sets, trace, footprints, key_prefix="store")
+    render_diagnostics_panel(trace, footprints)
+
+def setup_page():
+    """Configure the page and inject the custom CSS; runs first in main() rather than on import"""
+    st.set_page_config(
+        page_title="Enhanced Excel Analytics Dashboard",
+        page_icon="📊",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+
+    # Custom CSS for better styling
+    st.markdown("""
+<style>
+    .main-header {
+        font-size: 3rem;
+        font-weight: bold;
+        color: #1f77b4;
+        text-align: center;
+        margin-bottom: 1rem;
+    }
+    .metric-card {
+        background-color: #f0f2f6;
+        padding: 1rem;
+        border-radius: 0.5rem;
+        border-left: 4px solid #1f77b4;
+        margin-bottom: 1rem;
+    }
+    .upload-section {
+        background-color: #f8f9fa;
+        padding: 2rem;
+        border-radius: 1rem;
+        border: 2px dashed #dee2e6;
+        text-align: center;
+    }
+    .chart-container {
+        background-color: white;
+        padding: 1rem;
+        border-radius: 0.5rem;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+        margin-bottom: 1rem;
+    }
+    .stButton > button {
+        background-color: #1f77b4;
+        color: white;
+        border-radius: 0.5rem;
+        border: none;
+        padding: 0.5rem 1rem;
+        font-weight: 500;
+    }
+    .stButton > button:hover {
+        background-color: #1565c0;
+    }
+    .filter-section {
+        background-color: #e3f2fd;
+        padding: 1rem;
+        border-radius: 0.5rem;
+        margin-bottom: 1rem;
+    }
+</style>
+    """, unsafe_allow_html=True)
+
 def main():
+    setup_page()
+
+    # Per-stage timings and memory for the diagnostics panel
+    trace = []
+    footprints = []
+    quality_report = []
+
     # Header
     st.markdown('<h1 class="main-header">📊 Enhanced Excel Analytics Dashboard</h1>', unsafe_allow_html=True)
     st.markdown('<p style="text-align: center; font-size: 1.2rem; color: #666;">Advanced analytics for email/SMS delivery data with comprehensive metrics and insights</p>', unsafe_allow_html=True)
@@ -215,15 +1025,38 @@ def main():
         type=['xlsx', 'xls', 'csv'],
         help="Upload your Excel or CSV file (.xlsx, .xls, or .csv format)"
     )
+    compact = st.checkbox(
+        "🗜️ Compact rows on load",
+        value=COMPACT_ROWS,
+        help="Pre-sum the counts of rows that share the same date, account, template, country, origin and pricing. "
+             "Analyses give identical results on a much smaller frame; per-row columns such as wabanumber and "
+             "sourcesystem (and their filter) are dropped."
+    )
     st.markdown('</div>', unsafe_allow_html=True)
     
     if uploaded_file is not None:
         # Load and process data
-        df = load_and_process_data(uploaded_file)
+        estimated_mb = estimate_load_memory_mb(uploaded_file)
+        low_memory = should_use_low_memory_mode(estimated_mb)
+        memory_info = {'estimated_mb': estimated_mb, 'limit_mb': MEMORY_LIMIT_MB, 'low_memory': low_memory}
+        if low_memory:
+            st.warning(f"⚠️ This upload (~{estimated_mb:,.0f} MB in memory) is close to the {MEMORY_LIMIT_MB:,.0f} MB memory limit; "
+                       "switching to low-memory processing")
+
+        compaction_report = {}
+        df = load_and_process_data(uploaded_file, trace, low_memory, footprints, quality_report, compact, compaction_report)
         
         if df is not None:
+            # Charting is only needed once there is data; keep it off the upload screen's start-up path
+            import plotly.express as px
+
             # Display basic info
             st.success(f"✅ Successfully loaded {len(df):,} rows and {len(df.columns)} columns")
+            if compaction_report:
+                st.info(f"🗜️ Compacted {compaction_report['rows_before']:,} raw rows into {compaction_report['rows_after']:,} "
+                        f"({compaction_report['ratio']:,.1f}× smaller); dropped "
+                        f"{', '.join(compaction_report['dropped_columns']) or 'no columns'}")
+            render_quality_panel(quality_report)
             
             # Show data preview
             st.markdown("## 📋 Data Preview")
@@ -237,108 +1070,79 @@ def main():
             st.markdown("## 🔍 Filters")
             st.markdown('<div class="filter-section">', unsafe_allow_html=True)
             
-            # Origin Type Filter
-            if 'origintype' in df.columns:
-                origin_types = ['All'] + list(df['origintype'].dropna().unique())
-                selected_origin = st.selectbox("Filter by Origin Type:", origin_types)
-                
-                if selected_origin != 'All':
-                    df_filtered = df[df['origintype'] == selected_origin]
-                else:
-                    df_filtered = df
+            # Multi-dimensional Filters (resolved against indexes built once per upload)
+            with profile_stage(trace, "build_filter_indexes"):
+                filter_indexes = build_filter_indexes(df)
+            available_filters = [col for col in FILTER_COLUMNS if col in filter_indexes]
+            selections = {}
+            date_range = None
+
+            if available_filters:
+                filter_cols = st.columns(3)
+                for i, col in enumerate(available_filters):
+                    with filter_cols[i % 3]:
+                        selections[col] = st.multiselect(
+                            f"Filter by {FILTER_COLUMNS[col]}:",
+                            list(filter_indexes[col])
+                        )
             else:
-                df_filtered = df
-                st.info("No 'origintype' column found in the data")
-            
+                st.info("No filterable columns found in the data")
+
+            parsed_dates = filter_indexes.get('as_of_date_parsed')
+            if parsed_dates:
+                min_date, max_date = min(parsed_dates.values()), max(parsed_dates.values())
+                picked_dates = st.date_input(
+                    "Filter by Date Range:",
+                    value=(min_date, max_date),
+                    min_value=min_date,
+                    max_value=max_date
+                )
+                if isinstance(picked_dates, (list, tuple)) and len(picked_dates) == 2:
+                    if tuple(picked_dates) != (min_date, max_date):
+                        date_range = tuple(picked_dates)
+
+            with profile_stage(trace, "resolve_filters"):
+                filter_rows = resolve_filter_rows(filter_indexes, selections, date_range)
+                if filter_rows is None:
+                    df_filtered = df
+                else:
+                    df_filtered = df.iloc[filter_rows]
+                    record_memory_footprint(footprints, "df_filtered", df_filtered)
+                st.caption(f"{len(df_filtered):,} of {len(df):,} rows match the selected filters")
+            # Identifies the filtered data for the tables' per-session sort and search state
+            dataset_key = (uploaded_file.file_id, compact, low_memory, date_range,
+                           tuple((col, tuple(map(str, values))) for col, values in selections.items()))
+
             st.markdown('</div>', unsafe_allow_html=True)
             
             # Overall Metrics
             st.markdown("## 📈 Overall Delivery Metrics")
-            metrics = calculate_delivery_metrics(df_filtered)
+            with profile_stage(trace, "calculate_delivery_metrics"):
+                metrics = calculate_delivery_metrics(df_filtered)
             
-            col1, col2, col3, col4 = st.columns(4)
+            render_metric_cards(metrics)
             
-            with col1:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h3>Total Requests</h3>
-                    <h2>{metrics['total_requests']:,.0f}</h2>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h3>Sent</h3>
-                    <h2>{metrics['total_sent']:,.0f}</h2>
-                    <p>{metrics['sent_percentage']:.1f}%</p>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col3:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h3>Delivered</h3>
-                    <h2>{metrics['total_delivered']:,.0f}</h2>
-                    <p>{metrics['delivered_percentage']:.1f}%</p>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col4:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h3>Submitted</h3>
-                    <h2>{metrics['total_submitted']:,.0f}</h2>
-                    <p>{metrics['submitted_percentage']:.1f}%</p>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            # Additional Metrics
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h3>Failed</h3>
-                    <h2>{metrics['total_failed']:,.0f}</h2>
-                    <p>{metrics['failed_percentage']:.1f}%</p>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col2:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h3>Pending</h3>
-                    <h2>{metrics['total_pending']:,.0f}</h2>
-                    <p>{metrics['pending_percentage']:.1f}%</p>
-                </div>
-                """, unsafe_allow_html=True)
-            
-            with col3:
-                st.markdown(f"""
-                <div class="metric-card">
-                    <h3>Not Sent</h3>
-                    <h2>{metrics['total_not_sent']:,.0f}</h2>
-                    <p>{metrics['not_sent_percentage']:.1f}%</p>
-                </div>
-                """, unsafe_allow_html=True)
+            # Funnel Conversion
+            render_funnel_section(df_filtered, trace, key="funnel")
             
             # Pricing Model Analysis
             st.markdown("## 💰 Pricing Model Analysis")
-            pricing_analysis = analyze_pricing_model_metrics(df_filtered)
+            with profile_stage(trace, "analyze_pricing_model_metrics"):
+                pricing_analysis = analyze_pricing_model_metrics(df_filtered)
             
             if not pricing_analysis.empty:
                 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
                 st.dataframe(pricing_analysis, use_container_width=True)
                 
                 # Pricing model chart
-                fig_pricing = px.bar(
-                    pricing_analysis,
-                    x='pricingmodel',
-                    y=['sentcount', 'deliveredcount', 'submittedcount'],
-                    title="Pricing Model Performance",
-                    barmode='group'
-                )
+                with profile_stage(trace, "chart_pricing"):
+                    fig_pricing = px.bar(
+                        pricing_analysis,
+                        x='pricingmodel',
+                        y=['sentcount', 'deliveredcount', 'submittedcount'],
+                        title="Pricing Model Performance",
+                        barmode='group'
+                    )
                 st.plotly_chart(fig_pricing, use_container_width=True)
                 st.markdown('</div>', unsafe_allow_html=True)
             else:
@@ -346,66 +1150,117 @@ def main():
             
             # Country Analysis
             st.markdown("## 🌍 Country-wise Analysis")
-            country_analysis = analyze_country_metrics(df_filtered)
+            with profile_stage(trace, "analyze_country_metrics"):
+                country_analysis = analyze_country_metrics(df_filtered)
             
             if not country_analysis.empty:
                 col1, col2 = st.columns(2)
                 
                 with col1:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                    st.dataframe(country_analysis.head(15), use_container_width=True)
+                    render_paginated_table(country_analysis, key="country_table", page_size=15, data_key=dataset_key)
                     st.markdown('</div>', unsafe_allow_html=True)
                 
                 with col2:
                     # Country delivery chart
-                    fig_country = px.bar(
-                        country_analysis.head(15),
-                        x='country',
-                        y='delivered_percentage',
-                        title="Top 15 Countries by Delivery Percentage"
-                    )
+                    with profile_stage(trace, "chart_country"):
+                        fig_country = px.bar(
+                            country_analysis.head(15),
+                            x='country',
+                            y='delivered_percentage',
+                            title="Top 15 Countries by Delivery Percentage"
+                        )
                     st.plotly_chart(fig_country, use_container_width=True)
             else:
                 st.info("No country data available")
             
             # Account Failure Analysis
             st.markdown("## ❌ Account Failure Analysis")
-            account_failures = analyze_account_failures(df_filtered)
+            with profile_stage(trace, "analyze_account_failures"):
+                account_failures = analyze_account_failures(df_filtered)
             
             if not account_failures.empty:
                 col1, col2 = st.columns(2)
                 
                 with col1:
                     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                    st.dataframe(account_failures.head(10), use_container_width=True)
+                    render_paginated_table(account_failures, key="account_table", page_size=10, data_key=dataset_key)
                     st.markdown('</div>', unsafe_allow_html=True)
                 
                 with col2:
                     # Account failure chart
-                    fig_account = px.bar(
-                        account_failures.head(10),
-                        x='accountid',
-                        y='failure_rate',
-                        title="Top 10 Accounts by Failure Rate"
-                    )
+                    with profile_stage(trace, "chart_account"):
+                        fig_account = px.bar(
+                            account_failures.head(10),
+                            x='accountid',
+                            y='failure_rate',
+                            title="Top 10 Accounts by Failure Rate"
+                        )
                     st.plotly_chart(fig_account, use_container_width=True)
             else:
                 st.info("No account ID data available")
-            
+
+            # Account → Template → Country Drill-down
+            st.markdown("## 🔎 Failure Drill-down")
+            with profile_stage(trace, "build_hierarchical_rollups"):
+                rollups = build_hierarchical_rollups(df_filtered)
+
+            if rollups is not None and not rollups['accounts'].empty:
+                selected_account = st.selectbox(
+                    "Select an account (sorted by failure rate):",
+                    rollups['accounts']['accountid'].tolist()
+                )
+                account_templates = get_account_templates(rollups, selected_account)
+
+                col1, col2 = st.columns(2)
+
+                with col1:
+                    st.markdown(f"### Templates for account {selected_account}")
+                    st.dataframe(account_templates, use_container_width=True)
+
+                with col2:
+                    template_names = dict(zip(map(_index_key, account_templates['tmplid'].tolist()),
+                                              account_templates['tmplname'].tolist()))
+                    selected_template = st.selectbox(
+                        "Select a template:",
+                        list(template_names),
+                        format_func=lambda tmplid: f"{tmplid} - {template_names[tmplid]}"
+                    )
+                    template_countries = get_template_countries(rollups, selected_account, selected_template)
+
+                    with profile_stage(trace, "chart_drilldown"):
+                        fig_drill = px.bar(
+                            template_countries,
+                            x='country',
+                            y='failure_rate',
+                            title=f"Failure Rate by Country for Template {selected_template}"
+                        )
+                    st.plotly_chart(fig_drill, use_container_width=True)
+                    st.dataframe(template_countries, use_container_width=True)
+            else:
+                st.info("Drill-down requires accountid, tmplid, tmplname and country columns")
+
             # Template Failure Analysis
             st.markdown("## 📧 Template Failure Analysis")
-            template_failures = analyze_template_failures(df_filtered)
+            with profile_stage(trace, "analyze_template_failures"):
+                template_failures = analyze_template_failures(df_filtered)
             
             if not template_failures.empty:
                 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-                st.dataframe(template_failures.head(10), use_container_width=True)
+                render_paginated_table(template_failures, key="template_table", data_key=dataset_key)
                 st.markdown('</div>', unsafe_allow_html=True)
             else:
                 st.info("No template data available")
             
+            # Template Search (over every loaded row, independent of the filters)
+            with profile_stage(trace, "build_template_search_index"):
+                template_search_index = build_template_search_index(df)
+            render_template_search(template_search_index, trace, key="template_search")
+            
             # Pricing Delivery Table
             st.markdown("## 📊 Pricing Model Delivery Table")
-            pricing_delivery = analyze_pricing_delivery_table(df_filtered)
+            with profile_stage(trace, "analyze_pricing_delivery_table"):
+                pricing_delivery = analyze_pricing_delivery_table(df_filtered)
             
             if not pricing_delivery.empty:
                 st.markdown('<div class="chart-container">', unsafe_allow_html=True)
@@ -414,20 +1269,139 @@ def main():
             else:
                 st.info("No pricing model data available")
             
+            # Delivery Trends
+            st.markdown("## 📅 Delivery Trends")
+            trend_dimensions = [col for col in ['pricingmodel', 'country', 'accountid'] if col in df_filtered.columns]
+
+            if 'as_of_date' in df_filtered.columns and trend_dimensions:
+                col1, col2, col3, col4 = st.columns(4)
+
+                with col1:
+                    trend_dimension = st.selectbox("Trend by:", trend_dimensions)
+                with col2:
+                    granularity = st.radio("Granularity:", ['Daily', 'Weekly'], horizontal=True)
+                with col3:
+                    window = st.slider("Rolling window (periods):", min_value=1, max_value=30, value=7)
+                with col4:
+                    top_n = st.slider("Top values by volume:", min_value=1, max_value=20, value=5)
+
+                with profile_stage(trace, "build_trends"):
+                    daily = build_daily_buckets(df_filtered, trend_dimension)
+                    trends = compute_rolling_trends(daily, trend_dimension, granularity, window, top_n)
+
+                if not trends.empty:
+                    rate_columns = [rate for rate in TREND_RATES if rate in trends.columns]
+                    trend_rate = st.selectbox("Rate:", rate_columns)
+                    with profile_stage(trace, "chart_trend"):
+                        fig_trend = px.line(
+                            trends,
+                            x='date',
+                            y=trend_rate,
+                            color=trends[trend_dimension].astype(str),
+                            markers=True,
+                            title=f"{granularity} {trend_rate.replace('_', ' ').title()} by {trend_dimension} ({window}-period rolling)"
+                        )
+                    st.plotly_chart(fig_trend, use_container_width=True)
+
+                    if trends['date'].nunique() < 2:
+                        st.info("Upload data covering more than one as_of_date to see trends over time")
+                else:
+                    st.info("No parseable as_of_date values found")
+            else:
+                st.info("Trend analysis requires an as_of_date column")
+
+            # Day-over-Day Comparison
+            st.markdown("## 🔀 Day-over-Day Comparison")
+            comparison_sides = None
+
+            if 'as_of_date' in df_filtered.columns:
+                comparison_mode = st.radio("Compare:", ["Two date ranges", "Another file"], horizontal=True)
+                with profile_stage(trace, "build_comparison_aggregates"):
+                    current_daily = build_daily_dimension_aggregates(df_filtered)
+
+                if comparison_mode == "Two date ranges":
+                    available_dates = sorted({day.date() for daily in current_daily.values() for day in daily.index.get_level_values('date').unique()})
+                    if len(available_dates) >= 2:
+                        col1, col2 = st.columns(2)
+                        with col1:
+                            base_dates = st.date_input("Baseline dates:", value=(available_dates[-2], available_dates[-2]),
+                                                       min_value=available_dates[0], max_value=available_dates[-1])
+                        with col2:
+                            current_dates = st.date_input("Current dates:", value=(available_dates[-1], available_dates[-1]),
+                                                          min_value=available_dates[0], max_value=available_dates[-1])
+                        if all(isinstance(dates, (list, tuple)) and len(dates) == 2 for dates in (base_dates, current_dates)):
+                            comparison_sides = (current_daily, tuple(base_dates), current_daily, tuple(current_dates))
+                    else:
+                        st.info("The filtered data covers a single as_of_date; compare against another file instead")
+                else:
+                    baseline_file = st.file_uploader("Baseline file:", type=['xlsx', 'xls', 'csv'], key="baseline_file")
+                    if baseline_file is not None:
+                        with profile_stage(trace, "load_baseline_file"):
+                            baseline_df, baseline_indexes = load_baseline_file(baseline_file.file_id, baseline_file, compact)
+                        if baseline_df is not None:
+                            # Compare the same population: the baseline gets the dimension filters applied above
+                            selection_key = tuple(sorted((col, tuple(values)) for col, values in selections.items() if values))
+                            with profile_stage(trace, "build_baseline_aggregates"):
+                                baseline_daily = build_baseline_aggregates(baseline_file.file_id, compact, selection_key,
+                                                                           baseline_df, baseline_indexes)
+                            comparison_sides = (baseline_daily, None, current_daily, None)
+
+            if comparison_sides is not None:
+                base_daily, base_range, current_side, current_range = comparison_sides
+                dimensions = [name for name in COMPARISON_DIMENSIONS if name in base_daily and name in current_side]
+                comparison_dimension = st.selectbox(
+                    "Compare by:", dimensions, format_func=lambda name: COMPARISON_DIMENSIONS[name][0]
+                )
+                with profile_stage(trace, "compare_aggregates"):
+                    comparison = compare_aggregates(
+                        sum_aggregate_range(base_daily[comparison_dimension], base_range),
+                        sum_aggregate_range(current_side[comparison_dimension], current_range)
+                    )
+
+                if not comparison.empty:
+                    label_columns = COMPARISON_DIMENSIONS[comparison_dimension][1]
+                    top_changes = comparison.head(15)
+                    fig_comparison = px.bar(
+                        top_changes,
+                        x=top_changes[label_columns].astype(str).agg(' - '.join, axis=1),
+                        y=['delivery_rate_delta', 'failure_rate_delta'],
+                        barmode='group',
+                        title=f"Top 15 {COMPARISON_DIMENSIONS[comparison_dimension][0]} Rate Changes by Impact"
+                    )
+                    fig_comparison.update_layout(xaxis_title=COMPARISON_DIMENSIONS[comparison_dimension][0], yaxis_title="Rate change (points)")
+                    st.plotly_chart(fig_comparison, use_container_width=True)
+                    render_paginated_table(comparison, key="comparison_table", page_size=15)
+                else:
+                    st.info("No rows on either side of the comparison")
+            elif 'as_of_date' not in df_filtered.columns:
+                st.info("Comparison requires an as_of_date column")
+
+            for name, frame in [("pricing_analysis", pricing_analysis), ("country_analysis", country_analysis),
+                                ("account_failures", account_failures), ("template_failures", template_failures),
+                                ("pricing_delivery", pricing_delivery)]:
+                record_memory_footprint(footprints, name, frame)
+
+            # Filtered Records
+            st.markdown("## 🗂️ Filtered Records")
+            render_paginated_table(df_filtered, key="records_table", data_key=dataset_key)
+            
             # Export Options
             st.markdown("## 💾 Export Options")
             
             col1, col2 = st.columns(2)
             
             with col1:
-                # Export to CSV
-                csv = df_filtered.to_csv(index=False)
-                st.download_button(
-                    label="📄 Download Filtered Data as CSV",
-                    data=csv,
-                    file_name=f"filtered_analysis_{uploaded_file.name.split('.')[0]}.csv",
-                    mime="text/csv"
-                )
+                # Export to CSV (built on demand in low-memory mode, since it copies the whole frame as text)
+                if not low_memory or st.button("📄 Prepare Filtered Data CSV"):
+                    with profile_stage(trace, "export_filtered_csv"):
+                        csv = df_filtered.to_csv(index=False)
+                    record_memory_footprint(footprints, "export_filtered_csv", csv)
+                    st.download_button(
+                        label="📄 Download Filtered Data as CSV",
+                        data=csv,
+                        file_name=f"filtered_analysis_{uploaded_file.name.split('.')[0]}.csv",
+                        mime="text/csv"
+                    )
             
             with col2:
                 # Export analysis summary
@@ -438,8 +1412,10 @@ def main():
                     'Percentage': [100, metrics['sent_percentage'], metrics['delivered_percentage'], 
                                   metrics['submitted_percentage'], metrics['failed_percentage'], metrics['pending_percentage'], metrics['not_sent_percentage']]
                 }
-                summary_df = pd.DataFrame(summary_data)
-                summary_csv = summary_df.to_csv(index=False)
+                with profile_stage(trace, "export_summary_csv"):
+                    summary_df = pd.DataFrame(summary_data)
+                    summary_csv = summary_df.to_csv(index=False)
+                record_memory_footprint(footprints, "export_summary_csv", summary_csv)
                 st.download_button(
                     label="📊 Download Analysis Summary",
                     data=summary_csv,
@@ -447,10 +1423,22 @@ def main():
                     mime="text/csv"
                 )
             
+            # Diagnostics
+            render_diagnostics_panel(trace, footprints, memory_info)
+            
         else:
             st.error("Failed to load the file. Please check the file format.")
     
     else:
+        if column_store.read_manifest(COLUMN_STORE_DIR)['rows']:
+            render_column_store_view(COLUMN_STORE_DIR, trace, footprints)
+            return
+
+        summaries = list_materialized_summaries(MATERIALIZED_DIR)
+        if summaries:
+            render_materialized_view(summaries, trace, footprints)
+            return
+
         # Show expected data structure
         st.markdown("## 📝 Expected Data Structure")
         st.markdown("""
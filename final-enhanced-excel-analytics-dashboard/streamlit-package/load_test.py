@@ -0,0 +1,161 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from streamlit import config
+from streamlit.logger import set_log_level
+from streamlit.testing.v1 import AppTest
+
+from delivery_pipeline import read_rss_mb, reset_peak_rss
+
+# Importing or rerunning the app outside `streamlit run` would otherwise log runtime warnings
+config.set_option('logger.level', 'error')
+set_log_level('error')
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_APP = os.path.join(APP_DIR, 'enhanced_streamlit_app.py')
+DEFAULT_DATA = os.path.join(APP_DIR, '..', 'test 27th.csv')
+
+# Serializes AppTest runs across session threads
+RUN_LOCK = threading.Lock()
+
+def find_widget(widgets, label=None, key=None):
+    """Return the first widget matching a label fragment or key, or None"""
+    for widget in widgets:
+        if (key is not None and widget.key == key) or (label is not None and label in widget.label):
+            return widget
+    return None
+
+def run_session(app_path, data, file_name, iterations, timeout):
+    """Drive one simulated analyst session and return (rerun latencies, error count, first error)
+
+    A session stops at its first failure: an exception in or around a rerun, or a widget the
+    step needs that the app did not render.
+    """
+    at = AppTest.from_file(app_path, default_timeout=timeout)
+    latencies = []
+
+    def rerun():
+        # AppTest compiles the script and swaps process-wide runtime state on every run, so runs
+        # cannot overlap; sessions interleave rerun by rerun and latencies exclude the wait
+        with RUN_LOCK:
+            start = time.perf_counter()
+            at.run()
+            latencies.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+
+    def expect(widget, description):
+        if widget is None:
+            raise RuntimeError(f"{description} is missing")
+        return widget
+
+    try:
+        # First paint of the upload screen, then the upload itself
+        rerun()
+        mime = 'text/csv' if file_name.endswith('.csv') else 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        expect(at.file_uploader[0] if len(at.file_uploader) else None, "File uploader").upload(file_name, data, mime)
+        rerun()
+        expect(find_widget(at.number_input, key="records_table_page"), "Records table after the upload")
+
+        for i in range(iterations):
+            # Narrow to one country, then page through the filtered records
+            country_filter = find_widget(at.multiselect, label="Country")
+            if country_filter is not None and country_filter.options:
+                country_filter.set_value([country_filter.options[i % len(country_filter.options)]])
+                rerun()
+
+            page = expect(find_widget(at.number_input, key="records_table_page"), "Records table page")
+            if page.proto.max > 1:
+                page.set_value(2)
+                rerun()
+
+            # Low-memory mode builds the CSV export on demand
+            prepare_export = find_widget(at.button, label="Prepare Filtered Data CSV")
+            if prepare_export is not None:
+                prepare_export.click()
+                rerun()
+
+            country_filter = find_widget(at.multiselect, label="Country")
+            if country_filter is not None:
+                country_filter.set_value([])
+                rerun()
+            expect(find_widget(at.number_input, key="records_table_page"), "Records table after clearing the filter")
+    except RuntimeError as error:
+        return latencies, 1, str(error)
+    except Exception as error:
+        return latencies, 1, f"{type(error).__name__}: {error}"
+
+    return latencies, 0, None
+
+def run_level(app_path, data, file_name, sessions, iterations, timeout):
+    """Run N concurrent sessions and summarize latency, throughput and memory"""
+    reset_peak_rss()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        futures = [pool.submit(run_session, app_path, data, file_name, iterations, timeout) for _ in range(sessions)]
+        results = [future.result() for future in futures]
+    wall_seconds = time.perf_counter() - start
+    rss, peak_rss = read_rss_mb()
+
+    latencies = np.array([latency for session, _, _ in results for latency in session]) * 1000
+    # A level whose sessions all failed before their first rerun has no latencies to summarize
+    percentile = lambda q: float(np.percentile(latencies, q)) if len(latencies) else None
+    return {
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'errors': sum(errors for _, errors, _ in results),
+        'error_messages': [message for _, _, message in results if message],
+        'wall_seconds': wall_seconds,
+        'throughput_reruns_per_second': len(latencies) / wall_seconds,
+        'p50_ms': percentile(50),
+        'p95_ms': percentile(95),
+        'p99_ms': percentile(99),
+        'max_ms': percentile(100),
+        'rss_mb': rss,
+        'peak_rss_mb': peak_rss
+    }
+
+def main():
+    """Run the load test"""
+    parser = argparse.ArgumentParser(description="Headless concurrent-session load test for the enhanced dashboard")
+    parser.add_argument('--app', default=DEFAULT_APP, help="Streamlit script to drive")
+    parser.add_argument('--file', default=DEFAULT_DATA, help="Delivery file each session uploads")
+    parser.add_argument('--concurrency', default='1,2,4,8', help="Comma-separated concurrent session counts")
+    parser.add_argument('--iterations', type=int, default=3, help="Filter/page/export cycles per session")
+    parser.add_argument('--timeout', type=float, default=120, help="Per-rerun timeout in seconds")
+    parser.add_argument('--output', help="Write the results as JSON to this path")
+    args = parser.parse_args()
+
+    with open(args.file, 'rb') as f:
+        data = f.read()
+    file_name = os.path.basename(args.file)
+
+    print(f"🚦 Load testing '{os.path.basename(args.app)}' with '{file_name}' ({len(data) / 1024 ** 2:,.1f} MB)")
+    print(f"{'sessions':>8} {'reruns':>7} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'reruns/s':>9} {'peak RSS MB':>12}")
+
+    results = []
+    for sessions in [int(n) for n in args.concurrency.split(',')]:
+        level = run_level(args.app, data, file_name, sessions, args.iterations, args.timeout)
+        results.append(level)
+        peak = f"{level['peak_rss_mb']:,.0f}" if level['peak_rss_mb'] is not None else "n/a"
+        p50, p95, p99 = (f"{level[name]:.1f}" if level[name] is not None else "n/a" for name in ('p50_ms', 'p95_ms', 'p99_ms'))
+        print(f"{level['sessions']:>8} {level['reruns']:>7} {level['errors']:>6} {p50:>9} "
+              f"{p95:>9} {p99:>9} {level['throughput_reruns_per_second']:>9.2f} {peak:>12}")
+        for message in level['error_messages'][:3]:
+            print(f"  ❌ {message}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'app': args.app, 'file': args.file, 'iterations': args.iterations, 'levels': results}, f, indent=2)
+        print(f"💾 Results written to '{args.output}'")
+
+    return 1 if any(level['errors'] for level in results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
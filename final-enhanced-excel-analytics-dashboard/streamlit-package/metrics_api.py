@@ -0,0 +1,219 @@
+import argparse
+import gzip
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from streamlit import config
+from streamlit.logger import set_log_level
+
+from delivery_pipeline import file_version
+
+# The analysis functions are shared with the dashboard; silence its bare-mode runtime warnings
+config.set_option('logger.level', 'error')
+set_log_level('error')
+
+from enhanced_streamlit_app import (
+    FILTER_COLUMNS,
+    analyze_account_failures,
+    analyze_country_metrics,
+    analyze_pricing_delivery_table,
+    analyze_pricing_model_metrics,
+    analyze_template_failures,
+    build_filter_indexes,
+    calculate_delivery_metrics,
+    load_and_process_data,
+    resolve_filter_rows
+)
+
+ENDPOINTS = {
+    '/metrics': calculate_delivery_metrics,
+    '/pricing': analyze_pricing_model_metrics,
+    '/countries': analyze_country_metrics,
+    '/accounts': analyze_account_failures,
+    '/templates': analyze_template_failures,
+    '/pricing-delivery': analyze_pricing_delivery_table
+}
+
+class MetricsStore:
+    """Loaded dataset, filter indexes and an LRU cache of encoded responses"""
+
+    def __init__(self, file_path, cache_size=256, quiet=False, compact=False):
+        self.file_path = file_path
+        self.cache_size = cache_size
+        self.quiet = quiet
+        self.compact = compact
+        self.lock = threading.Lock()
+        self.version = None
+        self.responses = OrderedDict()
+
+    def refresh(self):
+        """Reload the file when it changed on disk; cached responses belong to one file version"""
+        version = file_version(self.file_path)
+        if version == self.version:
+            return
+
+        with open(self.file_path, 'rb') as f:
+            df = load_and_process_data(f, compact=self.compact)
+        if df is None:
+            raise ValueError(f"Could not load '{self.file_path}'")
+
+        self.df = df
+        self.indexes = build_filter_indexes(df)
+        # Query strings are text; map them back to the indexed values (e.g. integer account IDs)
+        self.value_lookup = {
+            col: {str(value): value for value in self.indexes[col]} for col in FILTER_COLUMNS if col in self.indexes
+        }
+        self.version = version
+        self.responses.clear()
+
+    def parse_filters(self, params):
+        """Turn query parameters into index selections and an optional date range"""
+        selections = {}
+        for col, lookup in self.value_lookup.items():
+            raw_values = [value for param in params.get(col, []) for value in param.split(',') if value]
+            selections[col] = sorted({lookup[value] for value in raw_values if value in lookup}, key=str)
+            if raw_values and not selections[col]:
+                # Asked for values that do not exist: match nothing rather than everything
+                selections[col] = [None]
+
+        date_range = None
+        if 'start_date' in params or 'end_date' in params:
+            start = date.fromisoformat(params.get('start_date', ['0001-01-01'])[0])
+            end = date.fromisoformat(params.get('end_date', ['9999-12-31'])[0])
+            date_range = (start, end)
+
+        return selections, date_range
+
+    def parse_paging(self, params):
+        """Read limit and offset (0 = unset); raise ValueError for anything but non-negative integers"""
+        paging = []
+        for name in ('limit', 'offset'):
+            raw = params.get(name, ['0'])[0]
+            try:
+                value = int(raw)
+            except ValueError:
+                raise ValueError(f"{name} must be a non-negative integer, got '{raw}'") from None
+            if value < 0:
+                raise ValueError(f"{name} must be a non-negative integer, got {value}")
+            paging.append(value)
+        return paging
+
+    def get_response(self, path, params):
+        """Return (etag, json_bytes, gzip_bytes) for one endpoint and filter combination"""
+        with self.lock:
+            self.refresh()
+            selections, date_range = self.parse_filters(params)
+            limit, offset = self.parse_paging(params)
+            key = (path, tuple((col, tuple(map(str, values))) for col, values in selections.items()),
+                   date_range, limit, offset)
+
+            if key in self.responses:
+                self.responses.move_to_end(key)
+                return self.responses[key]
+
+            rows = resolve_filter_rows(self.indexes, selections, date_range)
+            df_filtered = self.df if rows is None else self.df.iloc[rows]
+            version = self.version
+
+        result = ENDPOINTS[path](df_filtered)
+        if isinstance(result, dict):
+            body = json.dumps(result, default=float)
+        else:
+            total_rows = len(result)
+            if offset or limit:
+                result = result.iloc[offset:offset + limit if limit else None]
+            body = f'{{"total_rows": {total_rows}, "rows": {result.to_json(orient="records")}}}'
+
+        body = body.encode('utf-8')
+        etag = f'"{version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+        response = (etag, body, gzip.compress(body, compresslevel=6))
+
+        with self.lock:
+            if version == self.version:
+                self.responses[key] = response
+            if len(self.responses) > self.cache_size:
+                self.responses.popitem(last=False)
+        return response
+
+def make_handler(store):
+    """Build a request handler bound to one metrics store"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/':
+                self.send_json(200, json.dumps({
+                    'endpoints': sorted(ENDPOINTS),
+                    'filters': sorted(FILTER_COLUMNS) + ['start_date', 'end_date'],
+                    'paging': ['limit', 'offset']
+                }).encode('utf-8'))
+                return
+            if url.path not in ENDPOINTS:
+                self.send_json(404, b'{"error": "unknown endpoint"}')
+                return
+
+            try:
+                etag, body, gzipped = store.get_response(url.path, parse_qs(url.query))
+            except ValueError as e:
+                self.send_json(400, json.dumps({'error': str(e)}).encode('utf-8'))
+                return
+
+            # Conditional request: an unchanged answer costs a header round-trip only
+            if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+
+            use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+            self.send_json(200, gzipped if use_gzip else body, etag, use_gzip)
+
+        def send_json(self, status, body, etag=None, gzipped=False):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+            if etag:
+                self.send_header('ETag', etag)
+            if gzipped:
+                self.send_header('Content-Encoding', 'gzip')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            if not store.quiet:
+                super().log_message(format, *args)
+
+    return MetricsHandler
+
+def main():
+    """Serve the dashboard metrics as JSON"""
+    parser = argparse.ArgumentParser(description="Local JSON API over the delivery analysis")
+    parser.add_argument('file', help="Delivery data file (CSV or Excel) to serve")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to bind")
+    parser.add_argument('--port', type=int, default=8502, help="Port to listen on")
+    parser.add_argument('--quiet', action='store_true', help="Do not log every request")
+    parser.add_argument('--compact', action='store_true',
+                        help="Pre-sum rows that share every grouped dimension (drops the sourcesystem filter)")
+    args = parser.parse_args()
+
+    store = MetricsStore(args.file, quiet=args.quiet, compact=args.compact)
+    store.refresh()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store))
+    print(f"📡 Serving metrics for '{args.file}' on http://{args.host}:{args.port}/ ({len(store.df):,} rows)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Shutting down")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# Queries shorter than one trigram scan the distinct names instead of using the postings
+TRIGRAM_LENGTH = 3
+
+def build_name_index(names):
+    """Trigram postings and a sorted prefix array over distinct names (case-insensitive)
+
+    Trigrams are taken over the UTF-8 bytes of each lower-cased name, so a byte-level
+    substring match is exactly a text substring match. Postings are stored CSR-style:
+    `grams` holds each distinct trigram code, `postings[offsets[i]:offsets[i + 1]]`
+    the sorted positions of the names that contain `grams[i]`.
+    """
+    names = pd.Index(pd.unique(pd.Series(names).dropna().astype(str)))
+    # NUL separates the names in the byte buffer, so it cannot be part of one
+    lowered = names.str.lower().str.replace('\x00', '', regex=False)
+    lowered_values = lowered.to_numpy(dtype=object)
+    name_count = max(len(names), 1)
+
+    buffer = np.frombuffer(('\x00'.join(lowered_values) + '\x00').encode('utf-8'), dtype=np.uint8)
+    separators = buffer == 0
+    name_of_byte = np.cumsum(separators) - separators
+    # Every byte position that starts a trigram without crossing into the next name
+    positions = np.flatnonzero(~(separators[:-2] | separators[1:-1] | separators[2:]))
+    wide = buffer.astype(np.int64)
+    codes = (wide[positions] << 16) | (wide[positions + 1] << 8) | wide[positions + 2]
+
+    # One sort groups (trigram, name) pairs by trigram with names ascending; drop repeats within a name
+    pairs = np.sort(codes * name_count + name_of_byte[positions])
+    pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+    gram_of_pair = pairs // name_count
+    starts = np.flatnonzero(np.r_[True, gram_of_pair[1:] != gram_of_pair[:-1]]) if len(pairs) else np.zeros(0, dtype=np.int64)
+
+    order = lowered.argsort()
+    return {
+        'names': names,
+        'lowered': lowered,
+        'grams': gram_of_pair[starts],
+        'offsets': np.r_[starts, len(pairs)].astype(np.int64),
+        'postings': pairs % name_count,
+        'prefix_order': order,
+        'prefix_sorted': lowered_values[order]
+    }
+
+def _query_grams(query):
+    """Distinct trigram codes of a lower-cased query"""
+    encoded = np.frombuffer(query.encode('utf-8'), dtype=np.uint8).astype(np.int64)
+    return np.unique((encoded[:-2] << 16) | (encoded[1:-1] << 8) | encoded[2:])
+
+def search_names(index, query, mode='contains'):
+    """Sorted positions (into index['names']) of the names matching a query, case-insensitively"""
+    query = query.strip().lower()
+    if not query:
+        return np.zeros(0, dtype=np.int64)
+
+    if mode == 'prefix':
+        # Binary search over the sorted names; every match sits in one contiguous run
+        low = np.searchsorted(index['prefix_sorted'], query, side='left')
+        high = np.searchsorted(index['prefix_sorted'], query + '\U0010ffff', side='left')
+        return np.sort(index['prefix_order'][low:high])
+
+    if len(query.encode('utf-8')) < TRIGRAM_LENGTH:
+        return np.flatnonzero(index['lowered'].str.contains(query, regex=False))
+
+    codes = _query_grams(query)
+    slots = np.searchsorted(index['grams'], codes)
+    if (slots >= len(index['grams'])).any() or (index['grams'][np.minimum(slots, len(index['grams']) - 1)] != codes).any():
+        return np.zeros(0, dtype=np.int64)
+
+    # Intersect the posting lists shortest first, then confirm the candidates really contain the query
+    lists = sorted((index['postings'][index['offsets'][slot]:index['offsets'][slot + 1]] for slot in slots), key=len)
+    candidates = lists[0]
+    for postings in lists[1:]:
+        if not len(candidates):
+            break
+        candidates = np.intersect1d(candidates, postings, assume_unique=True)
+    if not len(candidates):
+        return candidates
+    return candidates[index['lowered'][candidates].str.contains(query, regex=False)]
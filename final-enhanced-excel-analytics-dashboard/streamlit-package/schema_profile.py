@@ -0,0 +1,84 @@
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+# Column roles: what a column is used for decides which stats and charts are worth computing
+ROLE_ID = 'id'
+ROLE_DIMENSION = 'dimension'
+ROLE_MEASURE = 'measure'
+ROLE_DATE = 'date'
+
+# Name tokens that mark identifiers and quantities (e.g. customer_id, wabanumber, requestedcount); the id/key/no
+# token must stand on its own, since a bare "id$" also matches paid or valid
+ID_NAME_PATTERN = re.compile(r'((^|[_\s-])(id|key|no|uuid|index)$|number$|code$|phone|^unnamed)', re.IGNORECASE)
+# camelCase identifiers such as CustomerID or orderId (case-sensitive, so "Paid" stays a measure)
+CAMEL_ID_PATTERN = re.compile(r'[a-z0-9](Id|ID)$')
+# Identifier names that run the id token on without a separator
+KNOWN_ID_NAMES = {'accountid', 'tmplid', 'templateid', 'customerid', 'userid', 'orderid', 'productid',
+                  'transactionid', 'sessionid'}
+MEASURE_NAME_PATTERN = re.compile(r'(count|amount|total|qty|quantity|sum|price|cost|revenue|rate|value)$', re.IGNORECASE)
+DATE_NAME_PATTERN = re.compile(r'(date|time|day|_at$|timestamp)', re.IGNORECASE)
+
+# Share of sampled values that must parse for a column to count as numeric or as dates
+PARSE_THRESHOLD = 0.9
+
+# Profiles keyed by header signature; every upload of the same export shares one profile
+_profile_cache = {}
+
+def header_signature(df):
+    """Hash of the column names and parsed types that identifies an export layout"""
+    header = '|'.join(f"{col}:{df[col].dtype.kind}" for col in df.columns)
+    return hashlib.sha1(header.encode('utf-8')).hexdigest()
+
+def parse_numbers(values):
+    """Parse values as numbers, accepting thousands separators (e.g. "1,426")"""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(np.float64)
+    return pd.to_numeric(values.astype(str).str.replace(',', '', regex=False).str.strip(), errors='coerce')
+
+def is_id_name(name):
+    """Whether a column name marks an identifier"""
+    return bool(ID_NAME_PATTERN.search(name) or CAMEL_ID_PATTERN.search(name)) or name.lower() in KNOWN_ID_NAMES
+
+def infer_column_role(name, values):
+    """Classify one column from a sample of its non-null values"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return ROLE_DATE
+    if pd.api.types.is_bool_dtype(values):
+        return ROLE_DIMENSION
+
+    present = values.dropna()
+    if present.empty:
+        # Nothing to look at; fall back to the name alone
+        return ROLE_MEASURE if MEASURE_NAME_PATTERN.search(name) else ROLE_DIMENSION
+
+    numbers = parse_numbers(present)
+    parsed_share = numbers.notna().mean()
+    if parsed_share >= PARSE_THRESHOLD or (MEASURE_NAME_PATTERN.search(name) and parsed_share >= 0.5):
+        # Uniqueness alone does not make an identifier: incomes and salaries are nearly all distinct too
+        if is_id_name(name) and not MEASURE_NAME_PATTERN.search(name):
+            return ROLE_ID
+        return ROLE_MEASURE
+
+    if is_id_name(name):
+        return ROLE_ID
+    if DATE_NAME_PATTERN.search(name) or present.dtype == object or pd.api.types.is_string_dtype(present):
+        distinct = pd.Series(present.unique()[:200])
+        dates = pd.to_datetime(distinct, format='mixed', errors='coerce')
+        if dates.notna().mean() >= PARSE_THRESHOLD:
+            return ROLE_DATE
+    return ROLE_DIMENSION
+
+def profile_schema(df, sample_rows=1000):
+    """Return {column: role} for a frame, inferred from a sample and cached by header signature"""
+    signature = header_signature(df)
+    if signature not in _profile_cache:
+        sample = df.sample(sample_rows, random_state=0) if len(df) > sample_rows else df
+        _profile_cache[signature] = {col: infer_column_role(str(col), sample[col]) for col in df.columns}
+    return dict(_profile_cache[signature])
+
+def columns_with_role(profile, role):
+    """Columns of a profile that have one role, in frame order"""
+    return [col for col, col_role in profile.items() if col_role == role]
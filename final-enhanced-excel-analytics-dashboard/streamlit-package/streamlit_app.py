@@ -1,61 +1,10 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-import numpy as np
-from io import BytesIO
-import base64
 
-# Page configuration
-st.set_page_config(
-    page_title="Excel Analytics Dashboard",
-    page_icon="📊",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+from schema_profile import ROLE_DATE, ROLE_ID, ROLE_MEASURE, columns_with_role, parse_numbers, profile_schema
 
-# Custom CSS for better styling
-st.markdown("""
-<style>
-    .main-header {
-        font-size: 3rem;
-        font-weight: bold;
-        color: #1f77b4;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .metric-card {
-        background-color: #f0f2f6;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        border-left: 4px solid #1f77b4;
-    }
-    .upload-section {
-        background-color: #f8f9fa;
-        padding: 2rem;
-        border-radius: 1rem;
-        border: 2px dashed #dee2e6;
-        text-align: center;
-    }
-    .chart-container {
-        background-color: white;
-        padding: 1rem;
-        border-radius: 0.5rem;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    .stButton > button {
-        background-color: #1f77b4;
-        color: white;
-        border-radius: 0.5rem;
-        border: none;
-        padding: 0.5rem 1rem;
-        font-weight: 500;
-    }
-    .stButton > button:hover {
-        background-color: #1565c0;
-    }
-</style>
-""", unsafe_allow_html=True)
+# How each column role is labelled in the column analysis
+ROLE_LABELS = {'id': 'Identifier', 'dimension': 'Categorical', 'measure': 'Numeric', 'date': 'Date'}
 
 def calculate_numeric_stats(df, column):
     """Calculate comprehensive statistics for numeric columns"""
@@ -85,8 +34,32 @@ def calculate_categorical_stats(df, column):
     }
     return stats
 
+def calculate_date_stats(df, column):
+    """Calculate statistics for date columns"""
+    dates = pd.to_datetime(df[column], format='mixed', errors='coerce')
+    stats = {
+        'count': df[column].count(),
+        'unique': dates.nunique(),
+        'earliest': dates.min(),
+        'latest': dates.max(),
+        'rows_per_day': dates.dt.normalize().value_counts().sort_index()
+    }
+    return stats
+
+def calculate_id_stats(df, column):
+    """Calculate statistics for identifier columns (counts only; their values carry no magnitude)"""
+    unique = df[column].nunique()
+    stats = {
+        'count': df[column].count(),
+        'unique': unique,
+        'duplicated': df[column].count() - unique
+    }
+    return stats
+
 def create_histogram(df, column):
     """Create histogram for numeric data"""
+    import plotly.express as px
+
     fig = px.histogram(
         df, 
         x=column, 
@@ -103,6 +76,8 @@ def create_histogram(df, column):
 
 def create_bar_chart(df, column):
     """Create bar chart for categorical data"""
+    import plotly.express as px
+
     value_counts = df[column].value_counts().head(10)
     fig = px.bar(
         x=value_counts.index,
@@ -118,6 +93,8 @@ def create_bar_chart(df, column):
 
 def create_box_plot(df, column):
     """Create box plot for numeric data"""
+    import plotly.express as px
+
     fig = px.box(
         df, 
         y=column,
@@ -129,13 +106,30 @@ def create_box_plot(df, column):
     )
     return fig
 
-def create_correlation_heatmap(df):
-    """Create correlation heatmap for numeric columns"""
-    numeric_df = df.select_dtypes(include=[np.number])
-    if numeric_df.shape[1] < 2:
+def create_date_chart(stats, column):
+    """Create line chart of rows per day for date data"""
+    import plotly.express as px
+
+    fig = px.line(
+        x=stats['rows_per_day'].index,
+        y=stats['rows_per_day'].values,
+        title=f"Rows per Day in {column}",
+        labels={'x': column, 'y': 'Rows'}
+    )
+    fig.update_layout(
+        height=400,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    return fig
+
+def create_correlation_heatmap(df, columns):
+    """Create correlation heatmap for measure columns"""
+    import plotly.express as px
+
+    if len(columns) < 2:
         return None
     
-    corr_matrix = numeric_df.corr()
+    corr_matrix = df[columns].corr()
     fig = px.imshow(
         corr_matrix,
         title="Correlation Heatmap",
@@ -148,7 +142,61 @@ def create_correlation_heatmap(df):
     )
     return fig
 
+def setup_page():
+    """Configure the page and inject the custom CSS; runs first in main() rather than on import"""
+    st.set_page_config(
+        page_title="Excel Analytics Dashboard",
+        page_icon="📊",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+
+    # Custom CSS for better styling
+    st.markdown("""
+<style>
+    .main-header {
+        font-size: 3rem;
+        font-weight: bold;
+        color: #1f77b4;
+        text-align: center;
+        margin-bottom: 1rem;
+    }
+    .metric-card {
+        background-color: #f0f2f6;
+        padding: 1rem;
+        border-radius: 0.5rem;
+        border-left: 4px solid #1f77b4;
+    }
+    .upload-section {
+        background-color: #f8f9fa;
+        padding: 2rem;
+        border-radius: 1rem;
+        border: 2px dashed #dee2e6;
+        text-align: center;
+    }
+    .chart-container {
+        background-color: white;
+        padding: 1rem;
+        border-radius: 0.5rem;
+        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+    }
+    .stButton > button {
+        background-color: #1f77b4;
+        color: white;
+        border-radius: 0.5rem;
+        border: none;
+        padding: 0.5rem 1rem;
+        font-weight: 500;
+    }
+    .stButton > button:hover {
+        background-color: #1565c0;
+    }
+</style>
+    """, unsafe_allow_html=True)
+
 def main():
+    setup_page()
+
     # Header
     st.markdown('<h1 class="main-header">📊 Excel Analytics Dashboard</h1>', unsafe_allow_html=True)
     st.markdown('<p style="text-align: center; font-size: 1.2rem; color: #666;">Upload your Excel file to generate comprehensive analytics and insights for customer meetings</p>', unsafe_allow_html=True)
@@ -166,6 +214,13 @@ def main():
         try:
             # Read the Excel file
             df = pd.read_excel(uploaded_file)
+
+            # Column roles decide which stats and charts are computed; ID columns get no numeric work
+            schema = profile_schema(df)
+            measure_cols = columns_with_role(schema, ROLE_MEASURE)
+            for col in measure_cols:
+                if not pd.api.types.is_numeric_dtype(df[col]):
+                    df[col] = parse_numbers(df[col])
             
             # Display basic info
             st.success(f"✅ Successfully loaded {len(df)} rows and {len(df.columns)} columns")
@@ -194,12 +249,11 @@ def main():
                 """, unsafe_allow_html=True)
             
             with col3:
-                numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
                 st.markdown(f"""
                 <div class="metric-card">
-                    <h3>Numeric Columns</h3>
-                    <h2>{len(numeric_cols)}</h2>
-                    <p>Columns with numeric data</p>
+                    <h3>Measure Columns</h3>
+                    <h2>{len(measure_cols)}</h2>
+                    <p>Numeric columns holding quantities</p>
                 </div>
                 """, unsafe_allow_html=True)
             
@@ -216,6 +270,13 @@ def main():
             # Data Preview
             st.markdown("## 📋 Data Preview")
             st.dataframe(df.head(10), use_container_width=True)
+
+            with st.expander("🧬 Column Roles", expanded=False):
+                st.dataframe(
+                    pd.DataFrame({'Column': list(schema), 'Role': [ROLE_LABELS[role] for role in schema.values()]}),
+                    use_container_width=True,
+                    hide_index=True
+                )
             
             # Column Analysis Section
             st.markdown("## 🔍 Column Analysis")
@@ -224,7 +285,8 @@ def main():
             selected_column = st.selectbox(
                 "Select a column for detailed analysis:",
                 df.columns.tolist(),
-                index=0
+                index=0,
+                format_func=lambda col: f"{col} ({ROLE_LABELS[schema[col]]})"
             )
             
             if selected_column:
@@ -233,8 +295,9 @@ def main():
                 with col1:
                     st.markdown("### Column Information")
                     
-                    # Check if numeric or categorical
-                    if df[selected_column].dtype in ['int64', 'float64']:
+                    # Stats and charts follow the column's role
+                    role = schema[selected_column]
+                    if role == ROLE_MEASURE:
                         stats = calculate_numeric_stats(df, selected_column)
                         
                         st.markdown(f"""
@@ -271,6 +334,38 @@ def main():
                         fig_box = create_box_plot(df, selected_column)
                         st.plotly_chart(fig_box, use_container_width=True)
                         
+                    elif role == ROLE_DATE:
+                        stats = calculate_date_stats(df, selected_column)
+                        
+                        st.markdown(f"""
+                        **Column Type:** Date  
+                        **Data Type:** {df[selected_column].dtype}  
+                        **Total Count:** {stats['count']:,}  
+                        **Unique Values:** {stats['unique']:,}
+                        """)
+                        
+                        col_a, col_b = st.columns(2)
+                        with col_a:
+                            st.metric("Earliest", f"{stats['earliest']:%Y-%m-%d}" if pd.notna(stats['earliest']) else "N/A")
+                        with col_b:
+                            st.metric("Latest", f"{stats['latest']:%Y-%m-%d}" if pd.notna(stats['latest']) else "N/A")
+                        
+                        # Rows per day
+                        st.markdown("#### Rows over Time")
+                        fig_date = create_date_chart(stats, selected_column)
+                        st.plotly_chart(fig_date, use_container_width=True)
+                        
+                    elif role == ROLE_ID:
+                        stats = calculate_id_stats(df, selected_column)
+                        
+                        st.markdown(f"""
+                        **Column Type:** Identifier  
+                        **Data Type:** {df[selected_column].dtype}  
+                        **Total Count:** {stats['count']:,}  
+                        **Unique Values:** {stats['unique']:,}  
+                        **Repeated Values:** {stats['duplicated']:,}
+                        """)
+                        
                     else:
                         stats = calculate_categorical_stats(df, selected_column)
                         
@@ -306,6 +401,8 @@ def main():
                     
                     # Data quality visualization
                     if missing_count > 0:
+                        import plotly.graph_objects as go
+
                         fig_missing = go.Figure(data=[
                             go.Pie(
                                 labels=['Valid Values', 'Missing Values'],
@@ -320,10 +417,10 @@ def main():
                         )
                         st.plotly_chart(fig_missing, use_container_width=True)
             
-            # Correlation Analysis (for numeric columns)
-            if len(numeric_cols) >= 2:
+            # Correlation Analysis (for measure columns)
+            if len(measure_cols) >= 2:
                 st.markdown("## 🔗 Correlation Analysis")
-                fig_corr = create_correlation_heatmap(df)
+                fig_corr = create_correlation_heatmap(df, measure_cols)
                 if fig_corr:
                     st.plotly_chart(fig_corr, use_container_width=True)
             
@@ -344,6 +441,8 @@ def main():
             
             with col2:
                 # Export to Excel
+                from io import BytesIO
+
                 output = BytesIO()
                 with pd.ExcelWriter(output, engine='openpyxl') as writer:
                     df.to_excel(writer, sheet_name='Data', index=False)
@@ -351,7 +450,7 @@ def main():
                     # Add summary sheet
                     summary_data = []
                     for col in df.columns:
-                        if df[col].dtype in ['int64', 'float64']:
+                        if schema[col] == ROLE_MEASURE:
                             stats = calculate_numeric_stats(df, col)
                             summary_data.append({
                                 'Column': col,
@@ -363,6 +462,24 @@ def main():
                                 'Min': stats['min'],
                                 'Max': stats['max']
                             })
+                        elif schema[col] == ROLE_DATE:
+                            stats = calculate_date_stats(df, col)
+                            summary_data.append({
+                                'Column': col,
+                                'Type': 'Date',
+                                'Count': stats['count'],
+                                'Unique': stats['unique'],
+                                'Min': stats['earliest'],
+                                'Max': stats['latest']
+                            })
+                        elif schema[col] == ROLE_ID:
+                            stats = calculate_id_stats(df, col)
+                            summary_data.append({
+                                'Column': col,
+                                'Type': 'Identifier',
+                                'Count': stats['count'],
+                                'Unique': stats['unique']
+                            })
                         else:
                             stats = calculate_categorical_stats(df, col)
                             summary_data.append({
@@ -0,0 +1,81 @@
+import json
+
+import pandas as pd
+
+import alert_rules
+
+RULES = [
+    {'name': 'account_failures', 'group_by': ['accountid'], 'metric': 'failure_rate', 'threshold': 10, 'min_volume': 100},
+    {'name': 'country_failures_3d', 'group_by': ['country'], 'metric': 'failure_rate', 'threshold': 10,
+     'window_days': 3}
+]
+
+def load_rules(tmp_path, rules=RULES):
+    path = tmp_path / 'rules.json'
+    path.write_text(json.dumps(rules))
+    return alert_rules.load_rules(str(path))
+
+def day_frame(day, failed):
+    """One day of delivery rows: account 1 fails `failed` of 1000 requests, account 2 never fails"""
+    return pd.DataFrame({
+        'as_of_date': [day, day],
+        'accountid': [1, 2],
+        'country': ['BR', 'BR'],
+        'requestedcount': [1000, 1000],
+        'failedcount': [failed, 0]
+    })
+
+def fired(alerts):
+    return sorted((alert['rule'], tuple(alert['group'].values())) for alert in alerts)
+
+def test_rule_fires_once_and_clears_when_its_window_drops_below(tmp_path):
+    rules = load_rules(tmp_path)
+    state_dir = str(tmp_path / 'state')
+
+    alerts = alert_rules.evaluate_ingest(state_dir, rules, day_frame('2025-07-01', 500), '/exports/d1.csv', 'v1')
+    assert fired(alerts) == [('account_failures', (1,)), ('country_failures_3d', ('BR',))]
+    assert alerts[0]['value'] == 50.0 and alerts[0]['as_of_date'] == '2025-07-01'
+
+    # Still crossing: already firing, no second alert
+    alerts = alert_rules.evaluate_ingest(state_dir, rules, day_frame('2025-07-02', 300), '/exports/d2.csv', 'v1')
+    assert alerts == []
+
+    # A clean day clears the one-day rule; the three-day window still averages above 10%
+    alert_rules.evaluate_ingest(state_dir, rules, day_frame('2025-07-03', 0), '/exports/d3.csv', 'v1')
+    state = alert_rules.read_alert_state(state_dir)
+    assert 'account_failures' not in state['firing']
+    assert state['firing']['country_failures_3d'] == ['["BR"]']
+
+    # Once the failing days leave the three-day window it clears too, and a new failure alerts again
+    alert_rules.evaluate_ingest(state_dir, rules, day_frame('2025-07-04', 0), '/exports/d4.csv', 'v1')
+    alert_rules.evaluate_ingest(state_dir, rules, day_frame('2025-07-05', 0), '/exports/d5.csv', 'v1')
+    assert alert_rules.read_alert_state(state_dir)['firing'] == {}
+    alerts = alert_rules.evaluate_ingest(state_dir, rules, day_frame('2025-07-06', 200), '/exports/d6.csv', 'v1')
+    assert fired(alerts) == [('account_failures', (1,))]
+
+def test_reingesting_a_file_replaces_its_contribution(tmp_path):
+    rules = load_rules(tmp_path)
+    state_dir = str(tmp_path / 'state')
+    first = day_frame('2025-07-01', 50)
+
+    assert alert_rules.evaluate_ingest(state_dir, rules, first, '/exports/day.csv', 'v1') == []
+    # The same file at the same version is skipped; a touched or re-exported copy replaces its sums
+    assert alert_rules.evaluate_ingest(state_dir, rules, first, '/exports/day.csv', 'v1') == []
+    for version in ['v2', 'v3']:
+        assert alert_rules.evaluate_ingest(state_dir, rules, first, '/exports/day.csv', version) == []
+
+    state = alert_rules.read_alert_state(state_dir)
+    sums = pd.read_parquet(tmp_path / 'state' / state['sums']['accountid'])
+    assert sums['requestedcount'].sum() == 2000 and sums['failedcount'].sum() == 50
+
+    # A corrected re-export that now crosses replaces the day rather than adding to it
+    alerts = alert_rules.evaluate_ingest(state_dir, rules, day_frame('2025-07-01', 300), '/exports/day.csv', 'v4')
+    assert fired(alerts) == [('account_failures', (1,)), ('country_failures_3d', ('BR',))]
+    assert [alert['value'] for alert in alerts] == [30.0, 15.0]
+
+    # The same path overwritten with the next day keeps the earlier day in the three-day window
+    alert_rules.evaluate_ingest(state_dir, rules, day_frame('2025-07-02', 0), '/exports/day.csv', 'v5')
+    state = alert_rules.read_alert_state(state_dir)
+    sums = pd.read_parquet(tmp_path / 'state' / state['sums']['country'])
+    assert sums['requestedcount'].sum() == 4000 and sums['failedcount'].sum() == 300
+    assert 'account_failures' not in state['firing']
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import column_store
+
+KEYS = ['as_of_date', 'accountid', 'tmplid', 'tmplname', 'country']
+
+def delivery_frame(rows=60000, cardinality=10 ** 6, seed=0):
+    """Random delivery rows whose key dictionaries multiply past int64"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'as_of_date': rng.choice(['2025-07-01', '2025-07-02', '2025-07-03'], rows),
+        'accountid': rng.integers(0, cardinality, rows),
+        'tmplid': rng.integers(0, cardinality, rows).astype(np.float64),
+        'tmplname': [f"template_{value}" for value in rng.integers(0, cardinality, rows)],
+        'country': [f"country_{value}" for value in rng.integers(0, cardinality, rows)],
+        'requestedcount': rng.integers(0, 100, rows),
+        'failedcount': rng.integers(0, 50, rows)
+    })
+    # Missing keys must stay groups of their own, as with groupby(dropna=False)
+    df.loc[rng.choice(rows, rows // 20, replace=False), 'tmplname'] = np.nan
+    df.loc[rng.choice(rows, rows // 20, replace=False), 'tmplid'] = np.nan
+    return df
+
+def expected_groups(df, keys):
+    return (df.groupby(keys, dropna=False)[['requestedcount', 'failedcount']].sum()
+            .reset_index().astype({'tmplid': np.float64} if 'tmplid' in keys else {}))
+
+def sorted_frame(frame, keys):
+    return frame.sort_values(keys, na_position='last', kind='stable').reset_index(drop=True)
+
+@pytest.mark.parametrize('keys', [KEYS, ['country'], ['accountid', 'tmplname']])
+def test_aggregate_store_matches_groupby(tmp_path, keys):
+    df = delivery_frame()
+    column_store.ingest_frame(str(tmp_path), df)
+    store = column_store.open_store(str(tmp_path))
+    if keys == KEYS:
+        key_space = np.prod([len(store['dictionaries'][col]) + 1 for col in keys], dtype=np.float64)
+        assert key_space > 2 ** 63
+
+    result = column_store.aggregate_store(store, keys, measures=['requestedcount', 'failedcount'])
+    result = result.astype({'tmplid': np.float64} if 'tmplid' in keys else {})
+
+    expected = sorted_frame(expected_groups(df, keys), keys)
+    actual = sorted_frame(result[keys + ['requestedcount', 'failedcount']], keys)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    assert result['record_count'].sum() == len(df)
+
+def test_ingest_drops_bytes_of_a_failed_ingest(tmp_path):
+    first, second = delivery_frame(rows=1000, seed=1), delivery_frame(rows=1000, seed=2)
+    column_store.ingest_frame(str(tmp_path), first)
+    # A crashed ingest that appended to one column but never wrote the manifest
+    with open(tmp_path / 'requestedcount.f8', 'ab') as f:
+        f.write(np.zeros(17, dtype=column_store.MEASURE_DTYPE).tobytes())
+    column_store.ingest_frame(str(tmp_path), second)
+
+    frame = column_store.query_frame(column_store.open_store(str(tmp_path)), columns=['accountid', 'requestedcount'])
+    expected = pd.concat([first, second], ignore_index=True)
+    assert frame['requestedcount'].sum() == expected['requestedcount'].sum()
+    assert (frame.groupby('accountid')['requestedcount'].sum()
+            == expected.groupby('accountid')['requestedcount'].sum()).all()
+
+def test_reingesting_a_source_replaces_its_rows_of_the_same_dates(tmp_path):
+    first, other = delivery_frame(rows=1000, seed=3), delivery_frame(rows=1000, seed=4)
+    column_store.ingest_frame(str(tmp_path), first, source='/exports/day.csv', version='v1')
+    column_store.ingest_frame(str(tmp_path), other, source='/exports/other.csv', version='v1')
+    # Same file at the same version: nothing to do
+    assert column_store.ingest_frame(str(tmp_path), first, source='/exports/day.csv', version='v1') == 0
+
+    # A re-export of two of the file's days replaces just those days; its third day stays as ingested
+    reexport = delivery_frame(rows=800, seed=5)
+    reexport = reexport[reexport['as_of_date'] != '2025-07-03']
+    column_store.ingest_frame(str(tmp_path), reexport, source='/exports/day.csv', version='v2')
+    # The same path overwritten with a new day adds that day
+    next_day = delivery_frame(rows=300, seed=6).assign(as_of_date='2025-07-04')
+    column_store.ingest_frame(str(tmp_path), next_day, source='/exports/day.csv', version='v3')
+
+    store = column_store.open_store(str(tmp_path))
+    expected = pd.concat([first[first['as_of_date'] == '2025-07-03'], reexport, other, next_day], ignore_index=True)
+    assert column_store.live_rows(store['manifest']) == len(expected)
+    frame = column_store.query_frame(store, columns=['as_of_date', 'requestedcount'])
+    assert frame['requestedcount'].sum() == expected['requestedcount'].sum()
+    day = column_store.query_frame(store, columns=['requestedcount'], date_range=('2025-07-01', '2025-07-01'))
+    assert day['requestedcount'].sum() == expected.loc[expected['as_of_date'] == '2025-07-01', 'requestedcount'].sum()
+
+    result = column_store.aggregate_store(store, ['country'], measures=['requestedcount', 'failedcount'])
+    pd.testing.assert_frame_equal(sorted_frame(result[['country', 'requestedcount', 'failedcount']], ['country']),
+                                  sorted_frame(expected_groups(expected, ['country']), ['country']), check_dtype=False)
@@ -0,0 +1,38 @@
+import json
+
+import pandas as pd
+
+from analyze_test_data_fixed import build_account_rollups, write_account_report
+
+def reject_constant(name):
+    raise ValueError(f"{name} is not valid JSON")
+
+def test_json_report_is_strict_json(tmp_path):
+    # Account 2 has a template and a country with nothing requested: its rates are undefined
+    df = pd.DataFrame({
+        'accountid': [1, 1, 2, 2],
+        'tmplid': [10, 11, 20, 21],
+        'tmplname': ['welcome', 'otp', 'promo', 'retry'],
+        'country': ['BR', 'IN', 'BR', 'MX'],
+        'requestedcount': [100, 50, 80, 0],
+        'submittedcount': [90, 50, 80, 0],
+        'sentcount': [90, 45, 70, 0],
+        'deliveredcount': [80, 40, 60, 0],
+        'readcount': [40, 20, 30, 0],
+        'failedcount': [10, 5, 10, 3],
+        'pendingcount': [0, 0, 0, 0],
+        'notsentcount': [10, 0, 0, 0]
+    })
+    funnel, templates, countries = build_account_rollups(df)
+    for accountid, totals in zip(funnel.index, funnel.to_dict(orient='records')):
+        write_account_report((accountid, totals, templates[accountid], countries[accountid], str(tmp_path), ['json']))
+
+    with open(tmp_path / '2.json') as f:
+        report = json.load(f, parse_constant=reject_constant)
+    assert report['accountid'] == '2'
+    assert report['funnel']['rows'] == 2
+    assert {row['tmplname']: row['failure_rate'] for row in report['templates']} == {'promo': 12.5, 'retry': None}
+    assert {row['country']: row['delivered_percentage'] for row in report['countries']} == {'BR': 75.0, 'MX': None}
+
+    with open(tmp_path / '1.json') as f:
+        assert json.load(f, parse_constant=reject_constant)['funnel']['requestedcount'] == 150